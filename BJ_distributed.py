@@ -0,0 +1,243 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import struct
+import sys
+import time
+from array import array
+from BJ_simulation import STRATEGIES, StolenWork, load_job, make_job, print_progress, run_chunk
+
+# A job of BJ_simulation.py spread over worker processes on any number of hosts, over TCP.
+#
+#   python BJ_distributed.py coordinator spec.yaml --port 9000 [--local N]
+#   python BJ_distributed.py worker coordinator-host:9000 [-b numba]
+#
+# The coordinator splits the job into chunks of simulations as run_job_stealing does and
+# hands them to whichever worker asks next; a worker that drops its connection or stalls
+# gets its chunks handed to the others. Every simulation has its own seed, so the results
+# are those of `BJ_simulation.py -s steal` whoever played what. --local N starts N workers
+# on this machine too, which is all it takes to try it on one box.
+#
+# Each message is a frame: payload length (uint32) and kind (uint8), then the payload, all
+# little-endian. Assignments are JSON; results are packed binary.
+#
+#   HELLO   worker -> coordinator  {"host": ..., "pid": ...}
+#   ASSIGN  coordinator -> worker  {"id", "job", "cell", "strategy", "first", "count", "backend"}
+#   RESULT  worker -> coordinator  chunk id (uint64), hands (uint64), seconds (float64),
+#                                  then the chunk's final balances (float64 each)
+#
+# The coordinator closes a worker's connection once the job is done. Nothing is ever
+# unpickled off the network, but the port is unauthenticated: keep it on a trusted network.
+
+HELLO, ASSIGN, RESULT = 1, 2, 3
+FRAME = struct.Struct('<IB')
+RESULT_HEAD = struct.Struct('<QQd')
+MAX_FRAME = 1 << 30
+PIPELINE = 2  # Chunks in flight per worker, so none waits on the coordinator between chunks
+
+def little_endian(values):
+    """The array in wire order, in place: byteswapped on big-endian hosts, for packing and unpacking alike"""
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+def pack_result(chunk_id, balances, hands, seconds):
+    return RESULT_HEAD.pack(chunk_id, hands, seconds) + little_endian(array('d', balances)).tobytes()
+
+def unpack_result(payload):
+    """Returns (chunk id, balances, hands, seconds) of a RESULT payload"""
+    chunk_id, hands, seconds = RESULT_HEAD.unpack_from(payload)
+    balances = array('d')
+    balances.frombytes(payload[RESULT_HEAD.size:])
+    return chunk_id, little_endian(balances).tolist(), hands, seconds
+
+def frame(kind, payload):
+    return FRAME.pack(len(payload), kind) + payload
+
+class Coordinator:
+    """Hands out the chunks of a StolenWork to the workers that connect and collects their results"""
+
+    def __init__(self, job, backend='python', cache_path=None, progress=None, chunk_seconds=0.5, timeout=60.0):
+        self.job = job
+        self.backend = backend
+        self.timeout = timeout
+        self.work = StolenWork(job, 1, cache_path, progress, chunk_seconds)
+        self.changed = asyncio.Condition()  # Chunks given back or the job done
+        self.chunk_ids = itertools.count(1)
+        self.workers = 0
+
+    async def notify(self):
+        async with self.changed:
+            self.changed.notify_all()
+
+    async def handle(self, reader, writer):
+        """Serves one worker connection until the job is done or the worker fails"""
+        outstanding = {}  # Chunk id -> (task, first, count)
+        peer = writer.get_extra_info('peername')
+        try:
+            kind, payload = await read_frame(reader)
+            if kind != HELLO:
+                return
+            peer = json.loads(payload).get('host', peer)
+            self.workers += 1
+            self.work.workers = self.workers  # Smaller chunks towards the end for more workers
+            while not self.work.complete():
+                while len(outstanding) < PIPELINE and (chunk := self.work.next_chunk()) is not None:
+                    chunk_id = next(self.chunk_ids)
+                    outstanding[chunk_id] = chunk
+                    task, first, count = chunk
+                    assignment = {'id': chunk_id, 'job': self.job, 'cell': self.work.cells[task[0]], 'strategy': task[1],
+                                  'first': first, 'count': count, 'backend': self.backend}
+                    writer.write(frame(ASSIGN, json.dumps(assignment).encode()))
+                await writer.drain()
+                if not outstanding:
+                    async with self.changed:
+                        await self.changed.wait()  # For chunks another worker gives back, or the end
+                    continue
+                kind, payload = await asyncio.wait_for(read_frame(reader), self.timeout)
+                if kind != RESULT:
+                    raise ValueError(f"Unexpected frame kind {kind}")
+                chunk_id, balances, hands, seconds = unpack_result(payload)
+                task, first, count = outstanding.pop(chunk_id)
+                if len(balances) != count:
+                    raise ValueError(f"Chunk {chunk_id} came back with {len(balances)} balances instead of {count}")
+                self.work.finished(task, first, (balances, hands, seconds))
+                if self.work.complete():
+                    await self.notify()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, KeyError, ValueError) as error:
+            print(f"Worker {peer} lost ({type(error).__name__}: {str(error) or 'no result in time'}); "
+                  f"{len(outstanding)} chunk(s) handed back", file=sys.stderr)
+        finally:
+            if outstanding:
+                for chunk in outstanding.values():
+                    self.work.retry(*chunk)
+                await self.notify()
+            writer.close()
+
+async def read_frame(reader):
+    length, kind = FRAME.unpack(await reader.readexactly(FRAME.size))
+    if length > MAX_FRAME:
+        raise ValueError(f"Frame of {length} bytes")
+    return kind, await reader.readexactly(length)
+
+async def coordinate(job, host='0.0.0.0', port=9000, local=0, backend='python', cache_path=None, progress=None,
+                     chunk_seconds=0.5, timeout=60.0):
+    """Runs a job on the workers that connect to host:port (and `local` ones started here); returns
+    the report rows and the hands played, as run_job_stealing does"""
+    coordinator = Coordinator(job, backend, cache_path, progress, chunk_seconds, timeout)
+    server = await asyncio.start_server(coordinator.handle, host, port)
+    port = server.sockets[0].getsockname()[1]
+    print(f"Coordinating on {host}:{port}", file=sys.stderr)
+    processes = [await asyncio.create_subprocess_exec(sys.executable, os.path.abspath(__file__), 'worker', f'127.0.0.1:{port}')
+                 for _ in range(local)]
+    try:
+        async with server:
+            async with coordinator.changed:
+                await coordinator.changed.wait_for(coordinator.work.complete)
+    finally:
+        coordinator.work.close()
+        for process in processes:
+            try:
+                await asyncio.wait_for(process.wait(), 10)  # They exit once the coordinator closes their connection
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+    return coordinator.work.rows(), coordinator.work.hands
+
+def connect(address, retry=30.0):
+    """Connects to host:port, retrying for up to `retry` seconds while the coordinator isn't listening yet"""
+    host, _, port = address.rpartition(':')
+    deadline = time.monotonic() + retry
+    while True:
+        try:
+            return socket.create_connection((host or '127.0.0.1', int(port)))
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+
+def receive(connection, size):
+    data = bytearray()
+    while len(data) < size:
+        block = connection.recv(size - len(data))
+        if not block:
+            raise EOFError
+        data += block
+    return bytes(data)
+
+def work(address, backend=None, retry=30.0):
+    """Plays the chunks a coordinator assigns until it closes the connection; returns the number played"""
+    played = 0
+    with connect(address, retry) as connection:
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection.sendall(frame(HELLO, json.dumps({'host': socket.gethostname(), 'pid': os.getpid()}).encode()))
+        while True:
+            try:
+                length, kind = FRAME.unpack(receive(connection, FRAME.size))
+                payload = receive(connection, length)
+            except EOFError:
+                return played
+            if kind != ASSIGN:
+                raise ValueError(f"Unexpected frame kind {kind}")
+            chunk = json.loads(payload)
+            job = make_job(chunk['job'])
+            cell = tuple(chunk['cell'])
+            if chunk['strategy'] not in STRATEGIES:
+                raise ValueError(f"Unknown strategy {chunk['strategy']}")
+            balances, hands, seconds = run_chunk(job, cell, chunk['strategy'], chunk['first'], chunk['count'],
+                                                 backend or chunk['backend'])
+            connection.sendall(frame(RESULT, pack_result(chunk['id'], balances, hands, seconds)))
+            played += 1
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a simulation job over worker processes on several hosts.")
+    roles = parser.add_subparsers(dest='role', required=True)
+    coordinator = roles.add_parser('coordinator', help="hand out a job's chunks and collect the results")
+    coordinator.add_argument('spec', nargs='?', help="JSON or YAML job spec, as for BJ_simulation.py")
+    coordinator.add_argument('--host', default='0.0.0.0', help="address to listen on (default: all)")
+    coordinator.add_argument('--port', type=int, default=9000, help="port to listen on (0 for any free one)")
+    coordinator.add_argument('--local', type=int, default=0, metavar='N', help="also start N workers on this machine")
+    coordinator.add_argument('-b', '--backend', choices=['python', 'numba'], default='python',
+                             help="backend the workers use, unless started with their own")
+    coordinator.add_argument('--chunk-seconds', type=float, default=0.5, help="target length of a chunk")
+    coordinator.add_argument('--timeout', type=float, default=60.0,
+                             help="seconds without a result before a busy worker counts as failed")
+    coordinator.add_argument('--cache', metavar='PATH', help="reuse results of identical runs from an on-disk cache")
+    coordinator.add_argument('-o', '--output', default='results_table.csv', help="results CSV (default results_table.csv)")
+    coordinator.add_argument('-q', '--quiet', action='store_true', help="no progress reports")
+    worker = roles.add_parser('worker', help="play the chunks a coordinator assigns")
+    worker.add_argument('address', help="coordinator's host:port")
+    worker.add_argument('-b', '--backend', choices=['python', 'numba'], help="override the coordinator's backend")
+    worker.add_argument('--retry', type=float, default=30.0, help="seconds to keep trying to connect")
+    args = parser.parse_args(argv)
+
+    if args.role == 'worker':
+        try:
+            work(args.address, args.backend, args.retry)
+        except (OSError, ValueError) as error:
+            sys.exit(f"Worker failed: {error}")
+        return
+
+    try:
+        job = load_job(args.spec)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    start = time.perf_counter()
+    try:
+        rows, hands = asyncio.run(coordinate(job, args.host, args.port, args.local, args.backend, args.cache,
+                                             None if args.quiet else print_progress, args.chunk_seconds, args.timeout))
+    except KeyboardInterrupt:
+        return
+    elapsed = time.perf_counter() - start
+
+    import pandas as pd  # Reporting only; workers never load it
+    results_df = pd.DataFrame(rows, columns=['Decks', 'Player Position', 'Strategy', 'Average Final Balance'])
+    print(results_df.to_string())
+    results_df.to_csv(args.output, index=False)
+    print(f"Played {hands:,} hands in {elapsed:.1f}s ({hands / elapsed:,.0f} hands/s)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from BJ_simulation import make_job, job_cells, run_cell
+from bj_core import ENGINE_VERSION, ResultCache
+from bj_core.cache import CACHE_DIR, config_key
+
+# A local HTTP/JSON front end for the simulator, on asyncio and the standard library only.
+#
+#   POST /jobs              job spec as in BJ_simulation.py, plus an optional "backend";
+#                           202 with the job, 200 straight away if the result is cached,
+#                           503 with Retry-After while the queue is full
+#   GET  /jobs/<id>         status, progress and (once done) the report rows
+#   GET  /jobs/<id>/events  server-sent events: "progress" per finished cell, then "done" or "error"
+#   GET  /health            queue and job counts
+#
+# Jobs wait in a bounded queue; each runs its cells in parallel on a process pool.
+
+MAX_BODY = 64 * 1024
+KEPT_JOBS = 1000  # Finished jobs remembered for status requests
+REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 503: 'Service Unavailable'}
+
+class Job:
+    def __init__(self, job_id, spec, backend, key):
+        self.id = job_id
+        self.spec = spec
+        self.backend = backend
+        self.key = key
+        self.status = 'queued'
+        self.progress = {'done': 0, 'total': len(job_cells(spec)), 'hands': 0, 'elapsed': 0.0, 'hands_per_second': 0.0, 'eta': None}
+        self.result = None
+        self.error = None
+        self.listeners = set()  # One asyncio.Queue per connected event stream
+
+    def publish(self, event, data):
+        for listener in self.listeners:
+            listener.put_nowait((event, data))
+
+    def describe(self):
+        return {'id': self.id, 'status': self.status, 'progress': self.progress, 'result': self.result,
+                'error': self.error, 'events': f'/jobs/{self.id}/events'}
+
+class SimulationService:
+    def __init__(self, workers=None, queue_size=16, concurrent_jobs=1, backend='python', cache_path=None):
+        # Spawned workers only import the engine, never this server's state
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.concurrent_jobs = concurrent_jobs
+        self.backend = backend
+        self.cache_path = cache_path
+        self.cache = ResultCache(cache_path) if cache_path else None
+        self.jobs = OrderedDict()
+        self.active = {}  # Key -> queued or running job, so identical requests share one run
+        self.ids = itertools.count(1)
+        self.runners = []
+
+    def start(self):
+        self.runners = [asyncio.create_task(self.runner()) for _ in range(self.concurrent_jobs)]
+
+    def close(self):
+        for runner in self.runners:
+            runner.cancel()
+        self.pool.shutdown(cancel_futures=True)
+        if self.cache:
+            self.cache.close()
+
+    def submit(self, payload):
+        """Returns (HTTP status, response body) for a job request"""
+        if not isinstance(payload, dict):
+            return 400, {'error': 'Body must be a JSON object'}
+        payload = dict(payload)
+        backend = payload.pop('backend', self.backend)
+        if backend not in ('python', 'numba'):
+            return 400, {'error': "backend must be 'python' or 'numba'"}
+        try:
+            spec = make_job(payload)
+        except ValueError as error:
+            return 400, {'error': str(error)}
+
+        key = config_key({'job': spec}, ENGINE_VERSION)  # Both backends give the same results
+        if key in self.active:
+            return 202, self.active[key].describe()
+        job = Job(str(next(self.ids)), spec, backend, key)
+        cached = self.cache.get({'job': spec}) if self.cache else None
+        if cached is not None:
+            job.status = 'done'
+            job.result = cached
+            job.progress['done'] = job.progress['total']
+            self.remember(job)
+            return 200, job.describe()
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            return 503, {'error': 'Job queue is full, retry later'}
+        self.active[key] = job
+        self.remember(job)
+        return 202, job.describe()
+
+    def remember(self, job):
+        self.jobs[job.id] = job
+        while len(self.jobs) > KEPT_JOBS:
+            oldest = next(iter(self.jobs.values()))
+            if oldest.status in ('queued', 'running'):
+                break
+            self.jobs.popitem(last=False)
+
+    async def runner(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                await self.run(job)
+            finally:
+                self.active.pop(job.key, None)
+                self.queue.task_done()
+
+    async def run(self, job):
+        loop = asyncio.get_running_loop()
+        cells = job_cells(job.spec)
+        results = [None] * len(cells)
+        job.status = 'running'
+        start = time.perf_counter()
+
+        async def run_one(index, cell):
+            return index, await loop.run_in_executor(self.pool, run_cell, job.spec, cell, job.backend, self.cache_path)
+
+        tasks = [asyncio.ensure_future(run_one(index, cell)) for index, cell in enumerate(cells)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                index, (rows, hands, _) = await finished
+                results[index] = rows
+                progress = job.progress
+                progress['done'] += 1
+                progress['hands'] += hands
+                progress['elapsed'] = time.perf_counter() - start
+                progress['hands_per_second'] = progress['hands'] / progress['elapsed']
+                progress['eta'] = progress['elapsed'] * (progress['total'] - progress['done']) / progress['done']
+                job.publish('progress', dict(progress))
+        except Exception as error:
+            # Cancelling also takes the cells still queued off the pool
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            job.status = 'failed'
+            job.error = f'{type(error).__name__}: {error}'
+            job.publish('error', {'error': job.error})
+            return
+
+        job.result = [{'Decks': nb_decks, 'Player Position': label, 'Strategy': name, 'Average Final Balance': balance}
+                      for rows in results for nb_decks, label, name, balance in rows]
+        job.status = 'done'
+        if self.cache:
+            self.cache.put({'job': job.spec}, job.result)
+        job.publish('done', job.describe())
+
+    async def handle(self, reader, writer):
+        """One HTTP/1.1 request per connection"""
+        try:
+            request_line = await reader.readline()
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get('content-length', 0))
+            if length > MAX_BODY:
+                await self.respond(writer, 413, {'error': 'Request body too large'})
+                return
+            body = await reader.readexactly(length) if length else b''
+            await self.route(method, target.split('?', 1)[0], body, writer)
+        except (ValueError, asyncio.IncompleteReadError):
+            await self.respond(writer, 400, {'error': 'Malformed request'})
+        except ConnectionError:
+            pass  # The client went away
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body, writer):
+        match = re.fullmatch(r'/jobs/(\w+)(/events)?', path)
+        if path == '/jobs':
+            if method != 'POST':
+                await self.respond(writer, 405, {'error': 'Use POST to submit a job'})
+                return
+            try:
+                payload = json.loads(body or b'{}')
+            except ValueError:
+                await self.respond(writer, 400, {'error': 'Body must be a JSON job spec'})
+                return
+            status, response = self.submit(payload)
+            extra = {'Retry-After': '5'} if status == 503 else {}
+            await self.respond(writer, status, response, extra)
+        elif path == '/health':
+            if method != 'GET':
+                await self.respond(writer, 405, {'error': 'Use GET for health'})
+                return
+            await self.respond(writer, 200, {'queued': self.queue.qsize(), 'queue_size': self.queue.maxsize,
+                                             'active': len(self.active), 'jobs': len(self.jobs)})
+        elif match and method == 'GET' and match.group(1) in self.jobs:
+            job = self.jobs[match.group(1)]
+            if match.group(2):
+                await self.stream(job, writer)
+            else:
+                await self.respond(writer, 200, job.describe())
+        else:
+            await self.respond(writer, 404, {'error': 'Not found'})
+
+    async def respond(self, writer, status, payload, extra_headers=None):
+        body = json.dumps(payload).encode()
+        headers = {'Content-Type': 'application/json', 'Content-Length': str(len(body)), 'Connection': 'close'}
+        headers.update(extra_headers or {})
+        writer.write(self.head(status, headers) + body)
+        await writer.drain()
+
+    def head(self, status, headers):
+        lines = [f'HTTP/1.1 {status} {REASONS[status]}'] + [f'{name}: {value}' for name, value in headers.items()]
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def stream(self, job, writer):
+        """Server-sent events for one job, starting with its current progress"""
+        writer.write(self.head(200, {'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache', 'Connection': 'close'}))
+        listener = asyncio.Queue()
+        job.listeners.add(listener)
+        try:
+            if job.status in ('done', 'failed'):
+                listener.put_nowait(('done' if job.status == 'done' else 'error', job.describe()))
+            else:
+                listener.put_nowait(('progress', dict(job.progress)))
+            while True:
+                event, data = await listener.get()
+                writer.write(f'event: {event}\ndata: {json.dumps(data)}\n\n'.encode())
+                await writer.drain()  # A slow client holds up only its own stream
+                if event in ('done', 'error'):
+                    break
+        finally:
+            job.listeners.discard(listener)
+
+async def serve(host, port, **options):
+    service = SimulationService(**options)
+    service.start()
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"Serving simulations on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run blackjack simulations behind a local HTTP/JSON API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('-w', '--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument('--queue-size', type=int, default=16, help="jobs that may wait before requests get 503")
+    parser.add_argument('--concurrent-jobs', type=int, default=1, help="jobs whose cells share the pool at once")
+    parser.add_argument('-b', '--backend', choices=['python', 'numba'], default='python', help="default backend for jobs")
+    parser.add_argument('--cache', default=os.path.join(CACHE_DIR, 'results.sqlite'), metavar='PATH', help="result cache file")
+    parser.add_argument('--no-cache', action='store_true', help="always simulate")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, queue_size=args.queue_size,
+                          concurrent_jobs=args.concurrent_jobs, backend=args.backend,
+                          cache_path=None if args.no_cache else args.cache))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
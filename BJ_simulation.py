@@ -1,505 +1,461 @@
-import random
-from abc import ABC, abstractmethod
-import pandas as pd
-import matplotlib.pyplot as plt
-
-class CardCountingStrategy(ABC):
-    def __init__(self):
-        self.running_count = 0
-
-    @abstractmethod
-    def update_count(self, hand):
-        pass
-
-    @abstractmethod
-    def calculate_bet(self, base_bet, nb_deck, cards_dealt):
-        pass
-
-class HiLowStrategy(CardCountingStrategy):
-    def update_count(self, hand):
-        for rank in hand:
-            if rank in ['2', '3', '4', '5', '6']:
-                self.running_count += 1
-            elif rank in ['10', 'jack', 'queen', 'king', 'ace']:
-                self.running_count -= 1
-
-    def calculate_bet(self, base_bet, nb_deck, cards_dealt):
-        decks_remaining = max(((nb_deck * 52) - cards_dealt) / 52, 1e-6)
-        true_count = self.running_count / decks_remaining
-        if true_count <= 1:
-            return int(base_bet)
-        elif true_count < 3:
-            return int(base_bet * 2)
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from bj_core import BlackjackSimulator, HiLowStrategy, KOStrategy, FiveCountStrategy, Instrument, Checkpoint, ResultCache
+from bj_core.cache import CACHE_DIR
+
+# Strategies a job spec can list: key -> (strategy class, name in the report, basic strategy)
+STRATEGIES = {
+    'dealer': (None, "Play like dealer, same bet", False),
+    'basic': (None, "Basic Strategy, same bet", True),
+    'hilo': (HiLowStrategy, "HiLow + Basic Strategy", True),
+    'ko': (KOStrategy, "KO + Basic Strategy", True),
+    'fivecount': (FiveCountStrategy, "Five Count + Basic Strategy", True)
+}
+
+# The report column of run_cell(reference_simulations > 0): runs from fresh shoes, not carried-over ones
+FRESH_SHOE_COLUMN = 'Average Final Balance, Fresh Shoes'
+
+# The study a job spec describes; keys missing from a spec keep these values
+DEFAULT_JOB = {
+    'deck_counts': [1, 3, 5, 8],
+    'single_player': True,             # Also play each deck count heads-up against the dealer
+    'num_players': 7,                  # Seats at the multi-player table
+    'player_positions': [0, 2, 4, 6],  # Tracked seats at that table: 1st, 3rd, 5th and 7th player
+    'strategies': list(STRATEGIES),
+    'num_simulations': 1000,
+    'num_hands': 1000,
+    'base_bet': 8,
+    'initial_balance': 1000,
+    'seed': 42
+}
+
+def load_job(path=None):
+    """Reads a JSON or YAML job spec and fills in the defaults"""
+    if path is None:
+        return make_job({})
+    with open(path) as file:
+        if path.endswith(('.yaml', '.yml')):
+            import yaml  # Only YAML specs need PyYAML
+            spec = yaml.safe_load(file) or {}
         else:
-            return int(base_bet * 4)
-
-class KOStrategy(CardCountingStrategy):
-    def update_count(self, hand):
-        for rank in hand:
-            if rank in ['2', '3', '4', '5', '6', '7']:
-                self.running_count += 1
-            elif rank in ['10', 'jack', 'queen', 'king', 'ace']:
-                self.running_count -= 1
-
-    def calculate_bet(self, base_bet, nb_deck, cards_dealt):
-        if self.running_count <= 1:
-            return int(base_bet)
-        elif self.running_count < 3:
-            return int(base_bet * 2)
-        else:
-            return int(base_bet * 4)
-
-class FiveCountStrategy(CardCountingStrategy):
-    def __init__(self, nb_deck):
-        super().__init__()
-        self.total_fives = nb_deck * 4
-        self.seen_fives = 0
-        self.total_cards = nb_deck * 52
-        self.cards_dealt = 0
-
-    def update_count(self, hand):
-        for rank in hand:
-            if rank == '5':
-                self.seen_fives += 1
-            self.cards_dealt += 1
-
-    def calculate_bet(self, base_bet, nb_deck, cards_dealt):
-        unseen_fives = self.total_fives - self.seen_fives
-        unseen_cards = self.total_cards - self.cards_dealt
-
-        if unseen_fives == 0:
-            return int(base_bet)
-
-        count_ratio = unseen_cards / unseen_fives
-
-        if count_ratio > 14:
-            return int(base_bet * 4)
-        elif count_ratio < 12:
-            return int(base_bet * 0.5)
-        else:
-            return int(base_bet)
-
-    def reset(self):
-        self.seen_fives = 0
-        self.cards_dealt = 0
-
-class BlackjackSimulator:
-    def __init__(self, nb_decks=1, base_bet=8, initial_balance=1000, num_players=1, tracked_player_position=0, seed=None):
-        self.nb_decks = nb_decks
-        self.base_bet = base_bet
-        self.initial_balance = initial_balance
-        self.num_players = num_players
-        self.tracked_player_position = tracked_player_position
-        self.seed = seed
-        if seed is not None:
-            random.seed(seed)
-        self.deck = self.create_deck()
-        self.strategy = None
-        self.hands = []
-        self.cards_dealt = 0
-        self.reshuffle_threshold = random.randint(int(0.6 * len(self.deck)), int(0.9 * len(self.deck)))
-
-    def create_deck(self):
-        deck = []
-        for _ in range(self.nb_decks):
-            for suit in ['clubs', 'diamonds', 'hearts', 'spades']:
-                for rank in ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'jack', 'queen', 'king', 'ace']:
-                    deck.append(rank)
-        random.shuffle(deck)
-        return deck
-
-    def reshuffle_cards(self):
-        self.deck = self.create_deck()
-        self.cards_dealt = 0
-        if self.strategy:
-            if isinstance(self.strategy, FiveCountStrategy):
-                self.strategy.reset()
+            spec = json.load(file)
+    return make_job(spec)
+
+def is_integer(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def make_job(spec):
+    """Checks a job spec and returns it with the defaults filled in; raises ValueError if it is invalid"""
+    if not isinstance(spec, dict):
+        raise ValueError("A job spec must be a mapping of settings")
+    unknown = set(spec) - set(DEFAULT_JOB)
+    if unknown:
+        raise ValueError(f"Unknown job spec keys: {', '.join(sorted(unknown))}")
+    job = dict(DEFAULT_JOB)
+    job.update(spec)
+    for key in ('deck_counts', 'player_positions'):
+        if not isinstance(job[key], list) or not all(is_integer(value) for value in job[key]):
+            raise ValueError(f"{key} must be a list of integers")
+    if not isinstance(job['strategies'], list) or not all(isinstance(key, str) for key in job['strategies']):
+        raise ValueError("strategies must be a list of strategy names")
+    unknown = set(job['strategies']) - set(STRATEGIES)
+    if unknown:
+        raise ValueError(f"Unknown strategies: {', '.join(sorted(unknown))}; choose from {', '.join(STRATEGIES)}")
+    for key in ('num_players', 'num_simulations', 'num_hands'):
+        if not is_integer(job[key]) or job[key] < 1:
+            raise ValueError(f"{key} must be a positive integer")
+    for key in ('base_bet', 'initial_balance'):
+        value = job[key]
+        if not (is_integer(value) or isinstance(value, float)) or not (0 < value < math.inf):
+            raise ValueError(f"{key} must be a positive number")
+    if not isinstance(job['single_player'], bool):
+        raise ValueError("single_player must be true or false")
+    if not (is_integer(job['seed']) or isinstance(job['seed'], str)):
+        raise ValueError("seed must be an integer or a string")
+    if not all(nb_decks >= 1 for nb_decks in job['deck_counts']):
+        raise ValueError("deck_counts must be positive integers")
+    if not all(0 <= position < job['num_players'] for position in job['player_positions']):
+        raise ValueError(f"player_positions must be seats from 0 to {job['num_players'] - 1}")
+    return job
+
+def job_cells(job):
+    """Splits a job into cells of (decks, players, tracked seat, label).
+
+    Each cell is one simulator playing the job's strategies in order, as the original report
+    did, so cells are independent of each other and can run in any process.
+    """
+    cells = []
+    if job['single_player']:
+        for nb_decks in job['deck_counts']:
+            cells.append((nb_decks, 1, 0, 'Single Player'))
+    for nb_decks in job['deck_counts']:
+        for position in job['player_positions']:
+            cells.append((nb_decks, job['num_players'], position, f'Position {position + 1}'))
+    return cells
+
+def run_cell(job, cell, backend='python', cache_path=None, timings=False, checkpoint_dir=None, reference_simulations=0):
+    """Returns the report rows of one cell, the number of hands it played and, with timings=True,
+    an Instrument report per strategy (phase timings; the cache is bypassed). With a checkpoint_dir,
+    each strategy's runs are snapshotted there as they go and resumed if the cell is run again.
+    With reference_simulations > 0 each average is instead variance.run_reduced_variance's average
+    of runs from fresh shoes (FRESH_SHOE_COLUMN), against a control reference of that many runs per
+    counting strategy (kept by the cache), and rows gain its standard error, variance reduction
+    and efficiencies."""
+    nb_decks, num_players, position, label = cell
+    cache = ResultCache(cache_path) if cache_path else None
+    simulator = BlackjackSimulator(nb_decks=nb_decks, base_bet=job['base_bet'], initial_balance=job['initial_balance'],
+                                   num_players=num_players, tracked_player_position=position, seed=job['seed'],
+                                   backend=backend, cache=cache)
+    rows = []
+    reports = []
+    for key in job['strategies']:
+        strategy, name, use_basic_strategy = STRATEGIES[key]
+        if reference_simulations:
+            from bj_core.variance import control_reference, run_reduced_variance  # Needs numpy
+            reference = None
+            if strategy is not None:
+                reference = control_reference(simulator, strategy, reference_simulations, job['num_hands'], use_basic_strategy,
+                                              seed=f"{job['seed']}/reference")
+            report = run_reduced_variance(simulator, strategy, job['num_simulations'], job['num_hands'], use_basic_strategy,
+                                          reference=reference, seed=job['seed'])
+            rows.append([nb_decks, label, name, report['average'], report['standard_error'], report['variance_reduction'],
+                         report['efficiency'], report['reused_efficiency']])
+            continue
+        instrument = Instrument(phases=True) if timings else None
+        checkpoint = None
+        if checkpoint_dir:
+            checkpoint = Checkpoint(os.path.join(checkpoint_dir, f"{nb_decks}-{num_players}-{position}-{key}.bjcp"))
+        avg_final_balance = simulator.run_multiple_simulations(strategy, num_simulations=job['num_simulations'],
+                                                               num_hands=job['num_hands'], use_basic_strategy=use_basic_strategy,
+                                                               instrument=instrument, checkpoint=checkpoint)
+        rows.append([nb_decks, label, name, avg_final_balance])
+        if instrument is not None:
+            reports.append({'Decks': nb_decks, 'Player Position': label, 'Strategy': name, **instrument.report()})
+    return rows, simulator.hands_played, reports
+
+def run_job(job, workers=1, backend='python', cache_path=None, progress=None, timings=False, checkpoint_dir=None,
+            reference_simulations=0):
+    """Runs every cell of a job on `workers` processes; returns the report rows in cell order, the hands
+    played and the timing reports of run_cell(timings=True), if asked for.
+
+    progress(done, total, cell, hands, elapsed) is called as each cell finishes.
+    """
+    cells = job_cells(job)
+    results = [None] * len(cells)
+    reports = [None] * len(cells)
+    start = time.perf_counter()
+    hands = 0
+
+    def finished(index, cell_result):
+        nonlocal hands
+        results[index], cell_hands, reports[index] = cell_result
+        hands += cell_hands
+        if progress:
+            progress(sum(result is not None for result in results), len(cells), cells[index], hands, time.perf_counter() - start)
+
+    if workers <= 1:
+        for index, cell in enumerate(cells):
+            finished(index, run_cell(job, cell, backend, cache_path, timings, checkpoint_dir, reference_simulations))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(run_cell, job, cell, backend, cache_path, timings, checkpoint_dir, reference_simulations): index
+                       for index, cell in enumerate(cells)}
+            for future in as_completed(futures):
+                finished(futures[future], future.result())
+    return [row for rows in results for row in rows], hands, [report for cell_reports in reports for report in cell_reports]
+
+def simulation_seed(job, cell, key, index):
+    """The seed of one simulation of a stolen-work run, fixed by what it simulates and nothing else"""
+    nb_decks, num_players, position, _ = cell
+    text = f"{job['seed']}/{nb_decks}/{num_players}/{position}/{key}/{index}"
+    return int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], 'little')
+
+def run_chunk(job, cell, key, first, count, backend='python'):
+    """Plays simulations first .. first + count - 1 of one strategy in one cell, each from its own seed.
+    Returns their final balances, the hands played and the seconds it took."""
+    nb_decks, num_players, position, _ = cell
+    strategy, _, use_basic_strategy = STRATEGIES[key]
+    start = time.perf_counter()
+    simulator = BlackjackSimulator(nb_decks=nb_decks, base_bet=job['base_bet'], initial_balance=job['initial_balance'],
+                                   num_players=num_players, tracked_player_position=position, backend=backend)
+    balances = []
+    for index in range(first, first + count):
+        simulator.restart(simulation_seed(job, cell, key, index))
+        balances.append(max(simulator.run_simulation(strategy, job['num_hands'], use_basic_strategy), 0))
+    return balances, simulator.hands_played, time.perf_counter() - start
+
+def run_shared_chunk(name, size, offset, job, cell, key, first, count, backend='python'):
+    """run_chunk in a worker process, writing the balances into the parent's SharedResults block
+    from offset + first on; returns only the hands played and the seconds it took"""
+    from bj_core.parallel import SharedResults
+    results = SharedResults.attach(name, size)
+    try:
+        balances, hands, seconds = run_chunk(job, cell, key, first, count, backend)
+        results.balances[offset + first:offset + first + count] = balances
+    finally:
+        results.close()
+    return hands, seconds
+
+def task_config(job, cell, key):
+    """Cache key of one strategy's average in one cell of a stolen-work run"""
+    return {'job': job, 'cell': list(cell), 'strategy': key, 'seeds': 'per simulation'}
+
+class StolenWork:
+    """The chunks of simulations of a job, handed out largest estimated time left first.
+
+    Each simulation starts from its own seed (simulation_seed), so the results depend on the job
+    alone, never on who played which chunk. next_chunk() sizes a chunk from the hands per second
+    that earlier chunks of the same table size and strategy measured: about chunk_seconds of
+    work, and smaller towards the end so that all workers finish together. A chunk that was
+    handed out but never finished goes back with retry(). Tasks the cache already holds are
+    never handed out.
+    """
+
+    def __init__(self, job, workers=1, cache_path=None, progress=None, chunk_seconds=0.5):
+        self.job = job
+        self.workers = workers
+        self.progress = progress
+        self.chunk_seconds = chunk_seconds
+        self.cells = job_cells(job)
+        self.cache = ResultCache(cache_path) if cache_path else None
+        self.tasks = [(index, key) for index in range(len(self.cells)) for key in job['strategies']]
+        self.averages = {}
+        self.ranges = {}  # Task -> [next simulation, end]
+        for task in self.tasks:
+            config = task_config(job, self.cells[task[0]], task[1])
+            cached = self.cache.get(config) if self.cache else None
+            if cached is not None:
+                self.averages[task] = cached
             else:
-                self.strategy.running_count = 0
-
-    def deal_card(self):
-        if len(self.deck) == 0 or self.cards_dealt >= self.reshuffle_threshold:
-            self.reshuffle_cards()
-        self.cards_dealt += 1
-        return self.deck.pop()
-
-    def play_hand(self, strategy, bet, use_basic_strategy=False):
-        if self.num_players == 1:
-            player_hand = [self.deal_card(), self.deal_card()]
-            dealer_hand = [self.deal_card(), self.deal_card()]
-            self.hands = [player_hand, dealer_hand]
-            double_down = False
-            split_hands = []
-            split_bets = []
-
-            # Check for blackjack
-            if self.calculate_hand_value(player_hand) == 21:
-                if self.calculate_hand_value(dealer_hand) == 21:
-                    return 0  # Tie
-                else:
-                    return 1.5 * bet  # Player wins with blackjack
-
-            while True:
-                if use_basic_strategy:
-                    action = self.basic_strategy(player_hand, dealer_hand)
-                else:
-                    action = 'hit' if self.calculate_hand_value(player_hand) < 17 else 'stand'
-
-                if action == 'hit':
-                    player_hand.append(self.deal_card())
-                    if self.calculate_hand_value(player_hand) >= 21:
-                        break
-                elif action == 'double':
-                    double_down = True
-                    player_hand.append(self.deal_card())
-                    bet *= 2
-                    break
-                elif action == 'split':
-                    split_hands.append([player_hand[0], self.deal_card()])
-                    split_hands.append([player_hand[1], self.deal_card()])
-                    split_bets.append(bet)
-                    split_bets.append(bet)
-                    bet *= 2
-                    break
-                else:
-                    break
-
-            while self.calculate_hand_value(dealer_hand) < 17:
-                dealer_hand.append(self.deal_card())
-
-            player_total = self.calculate_hand_value(player_hand)
-            dealer_total = self.calculate_hand_value(dealer_hand)
-
-            if strategy:
-                strategy.update_count(player_hand)
-                strategy.update_count(dealer_hand)
-
-            if split_hands:
-                results = []
-                for i, hand in enumerate(split_hands):
-                    hand_total = self.calculate_hand_value(hand)
-                    if hand_total > 21:
-                        results.append(-split_bets[i])
-                    elif dealer_total > 21 or hand_total > dealer_total:
-                        results.append(split_bets[i])
-                    elif hand_total < dealer_total:
-                        results.append(-split_bets[i])
-                    else:
-                        results.append(0)
-                return sum(results)
-
-            if player_total > 21:
-                return -bet
-            elif dealer_total > 21 or player_total > dealer_total:
-                return bet if not double_down else 2 * bet
-            elif player_total < dealer_total:
-                return -bet if not double_down else -2 * bet
-            else:
-                return 0
+                self.ranges[task] = [0, job['num_simulations']]
+        self.retries = []  # Chunks to hand out again, before any new one
+        self.chunks = {task: [] for task in self.ranges}  # Task -> [(first simulation, balances)]
+        self.measured = {}  # (players, strategy) -> [hands, seconds]
+        self.start = time.perf_counter()
+        self.hands = 0
+
+    def rate(self, task):
+        """Estimated hands per second; tables deal about players + 1 times the cards of one hand"""
+        players = self.cells[task[0]][1]
+        same_strategy = [key for key in self.measured if key[1] == task[1]]
+        for key in [(players, task[1])] + same_strategy + list(self.measured):
+            if key in self.measured and self.measured[key][1] > 0:
+                return self.measured[key][0] / self.measured[key][1] * (key[0] + 1) / (players + 1)
+        return 100000 / (players + 1)
+
+    def time_left(self, task):
+        return (self.ranges[task][1] - self.ranges[task][0]) * self.job['num_hands'] / self.rate(task)
+
+    def next_chunk(self):
+        """Returns (task, first simulation, count) of the next chunk to play, or None if there's none left to hand out"""
+        if self.retries:
+            return self.retries.pop()
+        open_tasks = [task for task in self.ranges if self.ranges[task][0] < self.ranges[task][1]]
+        if not open_tasks:
+            return None
+        task = max(open_tasks, key=self.time_left)
+        total_left = sum(self.time_left(other) for other in open_tasks)
+        seconds = min(self.chunk_seconds, total_left / (2 * max(self.workers, 1)))
+        count = max(1, min(int(seconds * self.rate(task) / self.job['num_hands']), self.ranges[task][1] - self.ranges[task][0]))
+        first = self.ranges[task][0]
+        self.ranges[task][0] += count
+        return task, first, count
+
+    def retry(self, task, first, count):
+        self.retries.append((task, first, count))
+
+    def finished(self, task, first, result):
+        """Takes in what run_chunk returned for a chunk"""
+        balances, chunk_hands, seconds = result
+        self.hands += chunk_hands
+        total = self.measured.setdefault((self.cells[task[0]][1], task[1]), [0, 0.0])
+        total[0] += chunk_hands
+        total[1] += seconds
+        self.chunks[task].append((first, balances))
+        if sum(len(done) for _, done in self.chunks[task]) == self.job['num_simulations']:
+            balances = [balance for _, done in sorted(self.chunks[task]) for balance in done]
+            self.averages[task] = sum(balances) / len(balances)
+            if self.cache:
+                self.cache.put(task_config(self.job, self.cells[task[0]], task[1]), self.averages[task])
+            cell_done = [all((index, key) in self.averages for key in self.job['strategies']) for index in range(len(self.cells))]
+            if self.progress and cell_done[task[0]]:
+                self.progress(sum(cell_done), len(self.cells), self.cells[task[0]], self.hands, time.perf_counter() - self.start)
+
+    def complete(self):
+        return len(self.averages) == len(self.tasks)
+
+    def close(self):
+        if self.cache:
+            self.cache.close()
+
+    def rows(self):
+        return [[self.cells[index][0], self.cells[index][3], STRATEGIES[key][1], self.averages[(index, key)]]
+                for index, key in self.tasks]
+
+def run_job_stealing(job, workers=1, backend='python', cache_path=None, progress=None, chunk_seconds=0.5):
+    """run_job with every (cell, strategy) split into chunks of simulations (see StolenWork) that idle
+    workers take as they free up. The results depend on the job alone, never on the number of workers.
+    Workers write their balances into one shared-memory block, at a range per task, so only the
+    hands played and the time taken come back through the pool."""
+    work = StolenWork(job, workers, cache_path, progress, chunk_seconds)
+    try:
+        if workers <= 1:
+            while (chunk := work.next_chunk()) is not None:
+                task, first, count = chunk
+                work.finished(task, first, run_chunk(job, work.cells[task[0]], task[1], first, count, backend))
         else:
-            players_hands = [[self.deal_card(), self.deal_card()] for _ in range(self.num_players)]
-            dealer_hand = [self.deal_card(), self.deal_card()]
-
-            self.hands = players_hands + [dealer_hand]
-            double_down = False
-            split_hands = []
-            split_bets = []
-
-            for i, player_hand in enumerate(players_hands):
-                if self.calculate_hand_value(player_hand) == 21:
-                    continue
-                while True:
-                    if use_basic_strategy and i == self.tracked_player_position:
-                        action = self.basic_strategy(player_hand, dealer_hand)
-                    else:
-                        action = 'hit' if self.calculate_hand_value(player_hand) < 17 else 'stand'
-
-                    if action == 'hit':
-                        player_hand.append(self.deal_card())
-                        if self.calculate_hand_value(player_hand) >= 21:
+            from bj_core.parallel import SharedResults  # Needs numpy
+            size = len(work.tasks) * job['num_simulations']
+            offsets = {task: index * job['num_simulations'] for index, task in enumerate(work.tasks)}
+            results = SharedResults(size)  # Before the pool, whose workers must share its resource tracker
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    running = {}
+                    while True:
+                        while len(running) < 2 * workers and (chunk := work.next_chunk()) is not None:
+                            task, first, count = chunk  # Two per worker, so none waits on the parent between chunks
+                            running[pool.submit(run_shared_chunk, results.name, size, offsets[task], job,
+                                                work.cells[task[0]], task[1], first, count, backend)] = chunk
+                        if not running:
                             break
-                    elif action == 'double' and i == self.tracked_player_position:
-                        double_down = True
-                        player_hand.append(self.deal_card())
-                        bet *= 2
-                        break
-                    elif action == 'split' and i == self.tracked_player_position:
-                        split_hands.append([player_hand[0], self.deal_card()])
-                        split_hands.append([player_hand[1], self.deal_card()])
-                        split_bets.append(bet)
-                        split_bets.append(bet)
-                        bet *= 2
-                        break
-                    else:
-                        break
-
-            while self.calculate_hand_value(dealer_hand) < 17:
-                dealer_hand.append(self.deal_card())
-
-            tracked_hand = players_hands[self.tracked_player_position]
-            player_total = self.calculate_hand_value(tracked_hand)
-            dealer_total = self.calculate_hand_value(dealer_hand)
-
-            if strategy:
-                strategy.update_count(tracked_hand)
-                strategy.update_count(dealer_hand)
-
-            if split_hands:
-                results = []
-                for i, hand in enumerate(split_hands):
-                    hand_total = self.calculate_hand_value(hand)
-                    if hand_total > 21:
-                        results.append(-split_bets[i])
-                    elif dealer_total > 21 or hand_total > dealer_total:
-                        results.append(split_bets[i])
-                    elif hand_total < dealer_total:
-                        results.append(-split_bets[i])
-                    else:
-                        results.append(0)
-                return sum(results)
-
-            if player_total > 21:
-                return -bet
-            elif dealer_total > 21 or player_total > dealer_total:
-                return bet if not double_down else 2 * bet
-            elif player_total < dealer_total:
-                return -bet if not double_down else -2 * bet
-            else:
-                return 0
-
-    def calculate_hand_value(self, hand):
-        values = {'2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9, '10': 10,
-                  'jack': 10, 'queen': 10, 'king': 10, 'ace': 11}
-        result = 0
-        aces = 0
-        for rank in hand:
-            if rank == 'ace':
-                aces += 1
-            result += values[rank]
-        while result > 21 and aces:
-            result -= 10
-            aces -= 1
-        return result
-
-    def basic_strategy(self, player_hand, dealer_hand):
-        player_total = self.calculate_hand_value(player_hand)
-        dealer_card_rank = dealer_hand[0]
-        dealer_value = {'2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9, '10': 10, 'jack': 10, 'queen': 10, 'king': 10, 'ace': 11}[dealer_card_rank]
-
-        soft = 'ace' in player_hand and player_total <= 21
-        pair = len(player_hand) == 2 and player_hand[0] == player_hand[1]
-        can_double = len(player_hand) == 2
-
-        if player_total < 8:
-            action = 'hit'
-        elif player_total == 8:
-            if dealer_value in [2, 3, 4, 7, 8, 9, 10, 11]:
-                action = 'hit'
-            else:
-                action = 'double'
-        elif player_total == 9:
-            if dealer_value in [7, 8, 9, 10, 11]:
-                action = 'hit'
-            elif can_double:
-                action = 'double'
-            else:
-                action = 'hit'
-        elif player_total == 10:
-            if dealer_value in [10, 11] or not can_double:
-                action = 'hit'
-            else:
-                action = 'double'
-        elif player_total == 11:
-            if can_double:
-                action = 'double'
-            else:
-                action = 'hit'
-        elif player_total == 12:
-            if dealer_value in [2, 3, 7, 8, 9, 10, 11]:
-                action = 'hit'
-            else:
-                action = 'stand'
-        elif player_total in [13, 14, 15, 16]:
-            if dealer_value in [2, 3, 4, 5, 6]:
-                action = 'stand'
-            else:
-                action = 'hit'
-        elif player_total >= 17:
-            action = 'stand'
-        elif soft:
-            if player_total in [13, 14, 15, 16] and can_double:
-                if dealer_value in [4, 5, 6]:
-                    action = 'double'
-                else:
-                    action = 'hit'
-            elif player_total == 17:
-                if dealer_value in [2, 3, 4, 5, 6] and can_double:
-                    action = 'double'
-                else:
-                    action = 'hit'
-            elif player_total == 18:
-                if dealer_value in [3, 4, 5, 6] and can_double:
-                    action = 'double'
-                elif dealer_value in [2, 7, 8, 11]:
-                    action = 'stand'
-                else:
-                    action = 'hit'
-            elif player_total == 19:
-                if dealer_value == 6 and can_double:
-                    action = 'double'
-                else:
-                    action = 'stand'
-            elif player_total == 20:
-                action = 'stand'
-        elif pair:
-            if player_total == 4:
-                if dealer_value in [3, 4, 5, 6, 7]:
-                    action = 'split'
-                else:
-                    action = 'hit'
-            elif player_total == 6:
-                if dealer_value in [4, 5, 6, 7]:
-                    action = 'split'
-                else:
-                    action = 'hit'
-            elif player_total == 8:
-                if dealer_value in [5, 6]:
-                    action = 'double'
-                else:
-                    action = 'hit'
-            elif player_total == 10:
-                if dealer_value in [10, 11]:
-                    action = 'hit'
-                else:
-                    action = 'double'
-            elif player_total == 12:
-                if dealer_value in [2, 3, 4, 5, 6]:
-                    action = 'split'
-                else:
-                    action = 'hit'
-            elif player_total == 14:
-                if dealer_value in [8, 9, 11]:
-                    action = 'hit'
-                elif dealer_value == 10:
-                    action = 'stand'
-                else:
-                    action = 'split'
-            elif player_total == 18:
-                if dealer_value in [7, 10, 11]:
-                    action = 'stand'
-                else:
-                    action = 'split'
-            elif player_total == 20:
-                action = 'stand'
-            elif player_total == 16 or player_hand.count('ace') == 2:
-                action = 'split'
-
-        return action
-
-    def run_simulation(self, strategy_class, num_hands=1000, use_basic_strategy=False):
-        balance = self.initial_balance
-        if strategy_class:
-            if strategy_class == FiveCountStrategy:
-                self.strategy = FiveCountStrategy(self.nb_decks)
-            else:
-                self.strategy = strategy_class()
-        else:
-            self.strategy = None
-        self.cards_dealt = 0
-        for hand_number in range(num_hands):
-            if balance <= 0:
-                break
-            bet = self.base_bet if not self.strategy else self.strategy.calculate_bet(self.base_bet, self.nb_decks, self.cards_dealt)
-            result = self.play_hand(self.strategy, bet, use_basic_strategy)
-            balance += result
-            if self.cards_dealt >= self.reshuffle_threshold:
-                self.reshuffle_cards()
-
-        return balance
-
-    def run_multiple_simulations(self, strategy_class, num_simulations=1000, num_hands=1000, use_basic_strategy=False):
-        final_balances = []
-        for simulation_number in range(num_simulations):
-            final_balance = self.run_simulation(strategy_class, num_hands, use_basic_strategy)
-            final_balances.append(max(final_balance, 0))
-            if self.strategy:
-                self.strategy.running_count = 0
-        return sum(final_balances) / len(final_balances)
-
-
-if __name__ == "__main__":
-    deck_counts = [1, 3, 5, 8]
-    player_positions = [0, 2, 4, 6]  # 1st, 3rd, 7th player
-    num_simulations = 1000
-    num_hands = 1000
-    seed = 42
-
-    strategies = [
-        (None, "Play like dealer, same bet"),
-        (None, "Basic Strategy, same bet"),
-        (HiLowStrategy, "HiLow + Basic Strategy"),
-        (KOStrategy, "KO + Basic Strategy"),
-        (FiveCountStrategy, "Five Count + Basic Strategy")
-    ]
-
-    results = []
-
-    # Single player against dealer
-    for nb_decks in deck_counts:
-        print(f"Results for {nb_decks} deck(s) of cards, single player against dealer:")
-        simulator = BlackjackSimulator(nb_decks=nb_decks, base_bet=8, initial_balance=1000, num_players=1, tracked_player_position=0, seed = seed)
-
-        for strategy, name in strategies:
-            use_basic_strategy = "Basic Strategy" in name
-            avg_final_balance = simulator.run_multiple_simulations(strategy, num_simulations=num_simulations, num_hands=num_hands, use_basic_strategy=use_basic_strategy)
-            results.append([nb_decks, 'Single Player', name, avg_final_balance])
-            print(f"Average final balance for {name}: ${avg_final_balance:.2f}")
-
-
-    # Multiple players at the table
-    for nb_decks in deck_counts:
-        for position in player_positions:
-            print(f"Results for {nb_decks} deck(s) of cards, player at position {position + 1}:")
-            simulator = BlackjackSimulator(nb_decks=nb_decks, base_bet=8, initial_balance=1000, num_players=7, tracked_player_position=position, seed = seed)
-
-            for strategy, name in strategies:
-                use_basic_strategy = "Basic Strategy" in name
-                avg_final_balance = simulator.run_multiple_simulations(strategy, num_simulations=num_simulations, num_hands=num_hands, use_basic_strategy=use_basic_strategy)
-                results.append([nb_decks, f'Position {position + 1}', name, avg_final_balance])
-                print(f"Average final balance for {name}: ${avg_final_balance:.2f}")
-
-    results_df = pd.DataFrame(results, columns=['Decks', 'Player Position', 'Strategy', 'Average Final Balance'])
-    print(results_df)
-
-    # Save the results table to a CSV file
-    results_df.to_csv('results_table.csv', index=False)
-
-    # Graph for single player against dealer
-    plt.figure(figsize=(14, 7))
-    for strategy, name in strategies:
-        subset = results_df[(results_df['Strategy'] == name) & (results_df['Player Position'] == 'Single Player')]
-        plt.plot(subset['Decks'], subset['Average Final Balance'], marker='o', label=name)
-    plt.title('Average Final Balance for Single Player vs Dealer')
-    plt.xlabel('Number of Decks')
-    plt.ylabel('Average Final Balance')
-    plt.legend()
-    plt.grid(True)
-    # Save the figure
-    plt.savefig('single_player_vs_dealer.png')
-    plt.show()
-
-    # Graph for multiple players at the table
-    for position in player_positions:
+                        done, _ = wait(running, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            task, first, count = running.pop(future)
+                            hands, seconds = future.result()
+                            start = offsets[task] + first
+                            work.finished(task, first, (results.balances[start:start + count].tolist(), hands, seconds))
+            finally:
+                results.close()
+                results.unlink()
+    finally:
+        work.close()
+    return work.rows(), work.hands
+
+def print_progress(done, total, cell, hands, elapsed):
+    nb_decks, _, _, label = cell
+    rate = hands / elapsed if elapsed else 0
+    eta = elapsed * (total - done) / done
+    print(f"[{done}/{total}] {nb_decks} deck(s), {label} done - {hands:,} hands in {elapsed:.1f}s "
+          f"({rate:,.0f} hands/s), ETA {time.strftime('%H:%M:%S', time.gmtime(eta))}", file=sys.stderr)
+
+def plot_results(results_df, strategies, folder='.', show=False, column='Average Final Balance'):
+    """Saves one graph per table setup into folder, of the results in `column`; windows only open with show=True"""
+    import matplotlib
+    if not show:
+        matplotlib.use('Agg')  # Render to files only, no display needed
+    import matplotlib.pyplot as plt
+
+    os.makedirs(folder, exist_ok=True)
+    setups = [('Single Player', 'Average Final Balance for Single Player vs Dealer', 'single_player_vs_dealer.png')]
+    for label in results_df['Player Position'].unique():
+        if label != 'Single Player':
+            number = label.split()[-1]
+            setups.append((label, f'Average Final Balance for Player at Position {number}', f'player_position_{number}.png'))
+
+    for label, title, filename in setups:
+        if not (results_df['Player Position'] == label).any():
+            continue
         plt.figure(figsize=(14, 7))
-        for strategy, name in strategies:
-            subset = results_df[(results_df['Strategy'] == name) & (results_df['Player Position'] == f'Position {position + 1}')]
-            plt.plot(subset['Decks'], subset['Average Final Balance'], marker='o', label=name)
-        plt.title(f'Average Final Balance for Player at Position {position + 1}')
+        for name in strategies:
+            subset = results_df[(results_df['Strategy'] == name) & (results_df['Player Position'] == label)]
+            plt.plot(subset['Decks'], subset[column], marker='o', label=name)
+        plt.title(title)
         plt.xlabel('Number of Decks')
-        plt.ylabel('Average Final Balance')
+        plt.ylabel(column)
         plt.legend()
         plt.grid(True)
-        # Save the figure with position number in the filename
-        plt.savefig(f'player_position_{position + 1}.png')
+        plt.savefig(os.path.join(folder, filename))
+    if show:
         plt.show()
+    plt.close('all')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate blackjack strategies over deck counts and table positions.")
+    parser.add_argument('spec', nargs='?', help="JSON or YAML job spec; omitted keys keep the default study")
+    parser.add_argument('-w', '--workers', type=int, default=1, help="worker processes (default 1, 0 for one per CPU)")
+    parser.add_argument('-s', '--schedule', choices=['cells', 'steal'], default='cells',
+                        help="'cells' runs each table setup in one process, as the original study did; 'steal' splits "
+                             "them into chunks that idle workers take, with one seed per simulation")
+    parser.add_argument('-b', '--backend', choices=['python', 'numba'], default='python',
+                        help="simulation backend; numba falls back to python when not installed")
+    parser.add_argument('-f', '--format', choices=['csv', 'json', 'table'], default='csv',
+                        help="results file format; 'table' only prints the table")
+    parser.add_argument('-o', '--output', help="results file (default results_table.csv or results_table.json)")
+    parser.add_argument('--plots', default='.', metavar='DIR', help="folder for the graphs (default: current folder)")
+    parser.add_argument('--no-plots', action='store_true', help="skip the graphs")
+    parser.add_argument('--show', action='store_true', help="also open the graphs in windows once the run is done")
+    parser.add_argument('--cache', nargs='?', const=os.path.join(CACHE_DIR, 'results.sqlite'), metavar='PATH',
+                        help="reuse results of identical runs from an on-disk cache")
+    parser.add_argument('--timings', metavar='PATH',
+                        help="time the phases of every run (in Python, without the cache) and write the reports as JSON")
+    parser.add_argument('--checkpoints', metavar='DIR',
+                        help="snapshot runs in progress to DIR every few seconds; a run started again resumes from there")
+    parser.add_argument('--reduce-variance', action='store_true',
+                        help="estimate the average of runs from fresh shoes (a column of its own, not the usual "
+                             "average) with first-shoe stratification and flat-bet control variates, adding each "
+                             "average's standard error, variance reduction and efficiency per hand played; needs "
+                             "--cache, which keeps the control references")
+    parser.add_argument('--reference-simulations', type=int, metavar='N',
+                        help="runs in each control reference, made once per counting strategy and cell and then "
+                             "read from the cache (default 4 times num_simulations; the variance reduction can't "
+                             "beat about N / num_simulations, so a first run is slower than a plain one)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="no progress reports")
+    args = parser.parse_args(argv)
+
+    try:
+        job = load_job(args.spec)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    if args.timings and args.schedule == 'steal':
+        parser.error("--timings needs --schedule cells")
+    if args.reduce_variance and (args.schedule == 'steal' or args.timings or args.checkpoints):
+        parser.error("--reduce-variance needs --schedule cells, without --timings or --checkpoints")
+    if args.reduce_variance and not args.cache:
+        parser.error("--reduce-variance needs --cache to keep the control references between runs")
+    reference_simulations = 0
+    if args.reduce_variance:
+        reference_simulations = args.reference_simulations or 4 * job['num_simulations']
+    if args.checkpoints and args.schedule == 'steal':
+        parser.error("--checkpoints needs --schedule cells; stolen chunks are short enough to simply run again")
+    if args.checkpoints:
+        os.makedirs(args.checkpoints, exist_ok=True)
+    workers = args.workers if args.workers > 0 else os.cpu_count()
+
+    start = time.perf_counter()
+    if args.schedule == 'steal':
+        results, hands = run_job_stealing(job, workers, args.backend, args.cache, None if args.quiet else print_progress)
+    else:
+        results, hands, reports = run_job(job, workers, args.backend, args.cache, None if args.quiet else print_progress,
+                                          args.timings is not None, args.checkpoints, reference_simulations)
+    elapsed = time.perf_counter() - start
+
+    import pandas as pd  # Reporting only; workers never load it
+    balance_column = 'Average Final Balance'
+    if args.reduce_variance:
+        balance_column = FRESH_SHOE_COLUMN
+    columns = ['Decks', 'Player Position', 'Strategy', balance_column]
+    if args.reduce_variance:
+        columns += ['Standard Error', 'Variance Reduction', 'Efficiency', 'Reused Efficiency']
+    results_df = pd.DataFrame(results, columns=columns)
+    print(results_df.to_string())
+    if args.format == 'csv':
+        results_df.to_csv(args.output or 'results_table.csv', index=False)
+    elif args.format == 'json':
+        results_df.to_json(args.output or 'results_table.json', orient='records', indent=2)
+
+    if args.timings:
+        with open(args.timings, 'w') as file:
+            json.dump(reports, file, indent=2)
+
+    if not args.no_plots:
+        plot_results(results_df, [STRATEGIES[key][1] for key in job['strategies']], args.plots, args.show, balance_column)
+    print(f"Played {hands:,} hands in {elapsed:.1f}s ({hands / elapsed:,.0f} hands/s)", file=sys.stderr)
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+# Blackjack rules, card counting and basic strategy shared by the simulator (BJ_simulation.py)
+# and the pygame front end (BJ_pygame.py). Cards are ints; see cards.py for the encoding.
+
+from .cards import SUITS, RANKS, CARD_VALUES, make_card, card_name, build_shoe, hand_value
+from .counting import CardCountingStrategy, HiLowStrategy, KOStrategy, FiveCountStrategy, count_bin
+from .strategy import basic_strategy, hand_key, strategy_advice, table_strategy
+from .simulator import BlackjackSimulator, ENGINE_VERSION
+from .cache import ResultCache
+from .sketch import TDigest
+from .trajectory import BankrollTracker, plot_bankroll
+from .histogram import CountHistogram
+from .shoes import RandomCut, CutCard, ContinuousShuffler, InfiniteDeck
+from .instrument import Instrument
+from .checkpoint import Checkpoint
+from .betting import calibrate, cached_curve, kelly_ramp, kelly_strategy
+from .game import BlackjackEngine, ScriptedPlayer, run_headless
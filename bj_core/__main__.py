@@ -0,0 +1,12 @@
+import time
+from .game import validate_against_simulator
+
+# python -m bj_core: checks the GUI engine's payouts against the simulator
+start = time.perf_counter()
+report = validate_against_simulator(num_rounds=10000, seed=42)
+elapsed = time.perf_counter() - start
+print(f"Played {report['rounds']} headless rounds in {elapsed:.2f}s")
+print(f"GUI engine average per hand: {report['gui_mean']:.4f}")
+print(f"Simulator average per hand: {report['simulator_mean']:.4f}")
+print(f"Difference: {report['difference']:.4f} (3 standard errors: {3 * report['std_error']:.4f})")
+print("Payouts consistent" if report['consistent'] else "Payouts DIFFER")
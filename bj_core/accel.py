@@ -0,0 +1,531 @@
+# Compiled backend for BlackjackSimulator.run_simulation (backend='numba'). The whole hand
+# loop - deal, evaluate, decide, dealer draw, settle, count, reshuffle - runs over int arrays
+# in one call. Shuffles use CPython's own Mersenne Twister and shuffle algorithm on the state
+# taken from the simulator's random.Random, so a seed deals exactly the same cards as the pure
+# Python backend and both give the same balances. Without numba the kernel still runs
+# (slowly) as plain Python, which is only useful for checking it.
+
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from numba import njit
+    jit = njit(cache=True)
+    inline_jit = njit(cache=True, inline='always')  # Compiled into each caller, for per-card calls
+except ImportError:
+    njit = None
+    jit = inline_jit = lambda function: function
+
+from .cards import CARD_VALUE, RANK_BATCH
+from .counting import HiLowStrategy, KOStrategy, FiveCountStrategy, COUNT_MIN, NUM_BINS
+from .histogram import CountHistogram
+from .shoes import RandomCut, CutCard, ContinuousShuffler, InfiniteDeck
+
+HIT, STAND, DOUBLE, SPLIT = 0, 1, 2, 3
+ACTION_CODES = {'hit': HIT, 'stand': STAND, 'double': DOUBLE, 'split': SPLIT}
+STRATEGY_CODES = {HiLowStrategy: 1, KOStrategy: 2, FiveCountStrategy: 3}  # 0 is no strategy
+MAX_HAND = 24  # More cards than any hand can hold before reaching 21
+
+# Slots of the state array shared between the kernel and the simulator
+DECK_LEN, CARDS_DEALT, RUNNING_COUNT, SEEN_FIVES, STRATEGY_CARDS, MT_INDEX, THRESHOLD, HAND_NUMBER, TRAY_START, TRAY_LEN = range(10)
+# Shoe models of shoes.py, and the slots of the array describing one
+CUT, EACH_SHOE, CONTINUOUS, INFINITE = range(4)
+SHOE_MODE, SHOE_LOW, SHOE_HIGH, SHOE_DELAY = range(4)
+MAX_DRAWDOWN, RUIN_HAND, HANDS_PLAYED = range(3)  # Slots of the stats array
+
+def available():
+    return njit is not None and np is not None
+
+def strategy_code(strategy):
+    """Kernel code of a built-in strategy, or of one that only swaps in a RampBetting ramp; None if unknown"""
+    if strategy is None:
+        return 0
+    cls = type(strategy)
+    if cls in STRATEGY_CODES:
+        return STRATEGY_CODES[cls]
+    from .betting import RampBetting
+    bases = cls.__bases__
+    if len(bases) == 2 and bases[0] is RampBetting and bases[1] in STRATEGY_CODES:
+        return STRATEGY_CODES[bases[1]]
+    return None
+
+def shoe_params(shoe, shoe_size):
+    """The array describing a shoe model of shoes.py to the kernel, or None for a model it doesn't know"""
+    cls = type(shoe)
+    if cls is RandomCut:
+        mode = EACH_SHOE if shoe.each_shoe else CUT
+        return np.array([mode, int(shoe.low * shoe_size), int(shoe.high * shoe_size), 0], dtype=np.int64)
+    if cls is CutCard:
+        return np.array([CUT, 0, 0, 0], dtype=np.int64)
+    if cls is ContinuousShuffler:
+        return np.array([CONTINUOUS, 0, 0, shoe.delay], dtype=np.int64)
+    if cls is InfiniteDeck:
+        return np.array([INFINITE, 0, 0, 0], dtype=np.int64)
+    return None
+
+def supports(strategy, shoe=None):
+    """The kernel knows the built-in strategies and shoe models only; anything else runs in pure Python"""
+    return strategy_code(strategy) is not None and (shoe is None or shoe_params(shoe, 52) is not None)
+
+@jit
+def genrand_uint32(mt, state):
+    if state[MT_INDEX] >= 624:
+        for kk in range(624):
+            y = (mt[kk] & 0x80000000) | (mt[(kk + 1) % 624] & 0x7fffffff)
+            value = mt[(kk + 397) % 624] ^ (y >> 1)
+            if y & 1:
+                value ^= 0x9908b0df
+            mt[kk] = value
+        state[MT_INDEX] = 0
+    y = mt[state[MT_INDEX]]
+    state[MT_INDEX] += 1
+    y ^= y >> 11
+    y ^= (y << 7) & 0x9d2c5680
+    y ^= (y << 15) & 0xefc60000
+    y ^= y >> 18
+    return y
+
+@jit
+def randbelow(n, mt, state):
+    """random.Random._randbelow: rejection sampling on the top bit_length(n) bits"""
+    k = 0
+    while (n >> k) > 0:
+        k += 1
+    r = genrand_uint32(mt, state) >> (32 - k)
+    while r >= n:
+        r = genrand_uint32(mt, state) >> (32 - k)
+    return r
+
+@jit
+def reshuffle(deck, state, mt):
+    """create_deck() and strategy.reset(): a fresh shoe in build_shoe order, shuffled like random.shuffle"""
+    for i in range(len(deck)):
+        deck[i] = i % 52
+    for i in range(len(deck) - 1, 0, -1):
+        j = randbelow(i + 1, mt, state)
+        deck[i], deck[j] = deck[j], deck[i]
+    state[DECK_LEN] = len(deck)
+    state[CARDS_DEALT] = 0
+    state[RUNNING_COUNT] = 0
+    state[SEEN_FIVES] = 0
+    state[STRATEGY_CARDS] = 0
+
+@jit
+def draw_ranks(deck, state, mt):
+    """cards.draw_ranks(): RANK_BATCH words' worth of infinite-deck ranks, in reverse for dealing"""
+    drawn = 0
+    for i in range(RANK_BATCH):
+        rank = genrand_uint32(mt, state) >> 28
+        if rank < 13:
+            deck[drawn] = rank
+            drawn += 1
+    deck[:drawn] = deck[:drawn][::-1].copy()
+    state[DECK_LEN] = drawn
+
+@jit
+def new_shoe(deck, state, mt, shoe):
+    """reshuffle_cards(): a fresh shoe and, for RandomCut(each_shoe=True), a new cut card"""
+    reshuffle(deck, state, mt)
+    if shoe[SHOE_MODE] == EACH_SHOE:
+        state[THRESHOLD] = shoe[SHOE_LOW] + randbelow(shoe[SHOE_HIGH] - shoe[SHOE_LOW] + 1, mt, state)
+
+@jit
+def return_discards(deck, state, mt, shoe, tray, strategy_code, tags):
+    """ContinuousShuffler.deal(): discards old enough, or all needed to refill the machine, go back in at
+    random places, and the counted ones come off the count"""
+    size = tray.shape[1]
+    returning = state[HAND_NUMBER] - shoe[SHOE_DELAY]
+    while state[TRAY_LEN] and (tray[0, state[TRAY_START]] <= returning or state[DECK_LEN] == 0):
+        card = tray[1, state[TRAY_START]]
+        if tray[2, state[TRAY_START]]:
+            uncount_card(card, state, strategy_code, tags)
+        state[TRAY_START] = (state[TRAY_START] + 1) % size
+        state[TRAY_LEN] -= 1
+        position = randbelow(state[DECK_LEN] + 1, mt, state)
+        for k in range(state[DECK_LEN], position, -1):
+            deck[k] = deck[k - 1]
+        deck[position] = card
+        state[DECK_LEN] += 1
+
+@inline_jit
+def deal(hands, sizes, seat, deck, state, mt, shoe, tray, strategy_code, tags):
+    if shoe[SHOE_MODE] <= EACH_SHOE:
+        if state[DECK_LEN] == 0 or state[CARDS_DEALT] >= state[THRESHOLD]:
+            new_shoe(deck, state, mt, shoe)
+        state[CARDS_DEALT] += 1
+        state[DECK_LEN] -= 1
+        card = deck[state[DECK_LEN]]
+    else:
+        card = machine_card(deck, state, mt, shoe, tray, strategy_code, tags)
+    hands[seat, sizes[seat]] = card
+    sizes[seat] += 1
+
+@jit
+def machine_card(deck, state, mt, shoe, tray, strategy_code, tags):
+    """The next card of a model that deals its own: a continuous shuffler or an infinite deck"""
+    if shoe[SHOE_MODE] == CONTINUOUS:
+        return_discards(deck, state, mt, shoe, tray, strategy_code, tags)
+        state[DECK_LEN] -= 1
+        card = deck[state[DECK_LEN]]
+        end = (state[TRAY_START] + state[TRAY_LEN]) % tray.shape[1]
+        tray[0, end] = state[HAND_NUMBER]
+        tray[1, end] = card
+        tray[2, end] = 0
+        state[TRAY_LEN] += 1
+        state[CARDS_DEALT] = state[TRAY_LEN]
+        return card
+    if state[DECK_LEN] == 0:
+        draw_ranks(deck, state, mt)
+    state[DECK_LEN] -= 1
+    return deck[state[DECK_LEN]]
+
+@jit
+def hand_total(hands, sizes, seat, card_value):
+    total = 0
+    aces = 0
+    for k in range(sizes[seat]):
+        value = card_value[hands[seat, k]]
+        if value == 11:
+            aces += 1
+        total += value
+    while total > 21 and aces:
+        total -= 10
+        aces -= 1
+    return total
+
+@jit
+def table_action(hands, sizes, seat, upcard, action_table, card_value):
+    """strategy.table_strategy() over the same hand_key features"""
+    hard_total = 0
+    has_ace = 0
+    for k in range(sizes[seat]):
+        value = card_value[hands[seat, k]]
+        if value == 11:
+            has_ace = 1
+            value = 1
+        hard_total += value
+    soft = 1 if has_ace and hard_total + 10 <= 21 else 0
+    total = hard_total + 10 if soft else hard_total
+    if total > 21:
+        return STAND
+    two_cards = 1 if sizes[seat] == 2 else 0
+    pair_value = 0
+    if two_cards and hands[seat, 0] % 13 == hands[seat, 1] % 13:
+        pair_value = card_value[hands[seat, 0]]
+    return action_table[total, soft, has_ace, pair_value, two_cards, card_value[upcard]]
+
+@inline_jit
+def count_card(card, state, strategy_code, tags):
+    if strategy_code == 3:
+        if card % 13 == 3:  # A five
+            state[SEEN_FIVES] += 1
+            state[RUNNING_COUNT] = state[SEEN_FIVES]
+        state[STRATEGY_CARDS] += 1
+    else:
+        state[RUNNING_COUNT] += tags[card]
+
+@inline_jit
+def uncount_card(card, state, strategy_code, tags):
+    """strategy.uncount(): a counted card back in a continuous shuffler"""
+    if strategy_code == 3:
+        if card % 13 == 3:
+            state[SEEN_FIVES] -= 1
+            state[RUNNING_COUNT] = state[SEEN_FIVES]
+        state[STRATEGY_CARDS] -= 1
+    else:
+        state[RUNNING_COUNT] -= tags[card]
+
+@jit
+def count_hand(hands, sizes, seat, state, strategy_code, tags):
+    for k in range(sizes[seat]):
+        count_card(hands[seat, k], state, strategy_code, tags)
+
+@jit
+def count_tray(hands, sizes, seat, state, strategy_code, tags, tray):
+    """ContinuousShuffler.count_cards(): counts the seat's cards still in the tray and marks them counted"""
+    size = tray.shape[1]
+    for k in range(sizes[seat]):
+        card = hands[seat, k]
+        for i in range(state[TRAY_START] + state[TRAY_LEN] - 1, state[TRAY_START] - 1, -1):
+            slot = i % size
+            if tray[0, slot] != state[HAND_NUMBER]:
+                break
+            if tray[1, slot] == card and not tray[2, slot]:
+                tray[2, slot] = 1
+                count_card(card, state, strategy_code, tags)
+                break
+
+@jit
+def count_position(strategy_code, nb_decks, state):
+    """count_bin() of the strategy's bet_index(): the running count for KO, else the true count"""
+    running_count = state[RUNNING_COUNT]
+    if strategy_code == 2:
+        index = float(running_count)
+    else:
+        index = running_count / max(((nb_decks * 52) - state[CARDS_DEALT]) / 52, 1e-6)
+    return min(max(math.floor(index) - COUNT_MIN, 0), NUM_BINS - 1)
+
+@jit
+def calculate_bet(strategy_code, base_bet, nb_decks, state, ramp_units):
+    running_count = state[RUNNING_COUNT]
+    if len(ramp_units):
+        return float(int(base_bet * ramp_units[count_position(strategy_code, nb_decks, state)]))
+    if strategy_code == 1:
+        decks_remaining = max(((nb_decks * 52) - state[CARDS_DEALT]) / 52, 1e-6)
+        true_count = running_count / decks_remaining
+        if true_count <= 1:
+            return float(int(base_bet))
+        elif true_count < 3:
+            return float(int(base_bet * 2))
+        return float(int(base_bet * 4))
+    if strategy_code == 2:
+        if running_count <= 1:
+            return float(int(base_bet))
+        elif running_count < 3:
+            return float(int(base_bet * 2))
+        return float(int(base_bet * 4))
+    if strategy_code == 3:
+        unseen_fives = nb_decks * 4 - state[SEEN_FIVES]
+        unseen_cards = nb_decks * 52 - state[STRATEGY_CARDS]
+        if unseen_fives == 0:
+            return float(int(base_bet))
+        count_ratio = unseen_cards / unseen_fives
+        if count_ratio > 14:
+            return float(int(base_bet * 4))
+        elif count_ratio < 12:
+            return float(int(base_bet * 0.5))
+        return float(int(base_bet))
+    return base_bet
+
+@jit
+def play_hand(bet, hands, sizes, deck, state, mt, shoe, tray, num_players, tracked,
+              use_basic_strategy, strategy_code, tags, action_table, card_value):
+    """BlackjackSimulator.play_hand; rows num_players + 1 and + 2 of hands hold split hands"""
+    dealer = num_players
+    for seat in range(num_players + 3):
+        sizes[seat] = 0
+    for seat in range(num_players + 1):
+        deal(hands, sizes, seat, deck, state, mt, shoe, tray, strategy_code, tags)
+        deal(hands, sizes, seat, deck, state, mt, shoe, tray, strategy_code, tags)
+
+    if num_players == 1 and hand_total(hands, sizes, 0, card_value) == 21:
+        if hand_total(hands, sizes, dealer, card_value) == 21:
+            return 0.0
+        return 1.5 * bet
+
+    double_down = False
+    split = False
+    split_bet = bet
+    for seat in range(num_players):
+        if hand_total(hands, sizes, seat, card_value) == 21:
+            continue
+        while True:
+            if use_basic_strategy and seat == tracked:
+                action = table_action(hands, sizes, seat, hands[dealer, 0], action_table, card_value)
+            else:
+                action = HIT if hand_total(hands, sizes, seat, card_value) < 17 else STAND
+
+            if action == HIT:
+                deal(hands, sizes, seat, deck, state, mt, shoe, tray, strategy_code, tags)
+                if hand_total(hands, sizes, seat, card_value) >= 21:
+                    break
+            elif action == DOUBLE and seat == tracked:
+                double_down = True
+                deal(hands, sizes, seat, deck, state, mt, shoe, tray, strategy_code, tags)
+                bet *= 2
+                break
+            elif action == SPLIT and seat == tracked:
+                split = True
+                split_bet = bet
+                for half in range(2):
+                    row = num_players + 1 + half
+                    hands[row, 0] = hands[seat, half]
+                    sizes[row] = 1
+                    deal(hands, sizes, row, deck, state, mt, shoe, tray, strategy_code, tags)
+                bet *= 2
+                break
+            else:
+                break
+
+    while hand_total(hands, sizes, dealer, card_value) < 17:
+        deal(hands, sizes, dealer, deck, state, mt, shoe, tray, strategy_code, tags)
+
+    player_total = hand_total(hands, sizes, tracked, card_value)
+    dealer_total = hand_total(hands, sizes, dealer, card_value)
+
+    if strategy_code and shoe[SHOE_MODE] == CONTINUOUS:
+        count_tray(hands, sizes, tracked, state, strategy_code, tags, tray)
+        count_tray(hands, sizes, dealer, state, strategy_code, tags, tray)
+    elif strategy_code:
+        count_hand(hands, sizes, tracked, state, strategy_code, tags)
+        count_hand(hands, sizes, dealer, state, strategy_code, tags)
+
+    if split:
+        result = 0.0
+        for half in range(2):
+            hand_value = hand_total(hands, sizes, num_players + 1 + half, card_value)
+            if hand_value > 21:
+                result -= split_bet
+            elif dealer_total > 21 or hand_value > dealer_total:
+                result += split_bet
+            elif hand_value < dealer_total:
+                result -= split_bet
+        return result
+
+    if player_total > 21:
+        return -bet
+    elif dealer_total > 21 or player_total > dealer_total:
+        return bet if not double_down else 2 * bet
+    elif player_total < dealer_total:
+        return -bet if not double_down else -2 * bet
+    return 0.0
+
+@jit
+def run_hands(num_hands, balance, deck, state, mt, shoe, tray, nb_decks, num_players, tracked, base_bet,
+              use_basic_strategy, strategy_code, tags, action_table, card_value, ramp_units,
+              checkpoints, path, stats, counts, totals, squares, results, positions, ends):
+    """The run_simulation loop; returns the final balance and leaves shoe, count and RNG state in the arrays.
+    Also fills path with the balance after each checkpoint hand, stats with the drawdown, ruin
+    hand and hands played, counts/totals/squares with the CountHistogram sums when counts is
+    not empty and results/positions/ends with each hand's result, count bin and shoe depth when
+    they are not."""
+    hands = np.zeros((num_players + 3, MAX_HAND), dtype=np.int64)
+    sizes = np.zeros(num_players + 3, dtype=np.int64)
+    mode = shoe[SHOE_MODE]
+    peak = balance
+    point = 0
+    for hand_number in range(num_hands):
+        if balance <= 0:
+            break
+        position = count_position(strategy_code, nb_decks, state)
+        bet = calculate_bet(strategy_code, base_bet, nb_decks, state, ramp_units)
+        cards_dealt = state[CARDS_DEALT]
+        result = play_hand(bet, hands, sizes, deck, state, mt, shoe, tray, num_players, tracked,
+                           use_basic_strategy, strategy_code, tags, action_table, card_value)
+        balance += result
+        stats[HANDS_PLAYED] += 1
+        state[HAND_NUMBER] += 1
+        if len(counts):
+            counts[position] += 1
+            totals[position] += result
+            squares[position] += result * result
+        if len(results):
+            results[hand_number] = result
+            positions[hand_number] = position
+            ends[hand_number] = state[CARDS_DEALT] if state[CARDS_DEALT] > cards_dealt else -1
+        if balance > peak:
+            peak = balance
+        elif peak - balance > stats[MAX_DRAWDOWN]:
+            stats[MAX_DRAWDOWN] = peak - balance
+        if balance <= 0 and stats[RUIN_HAND] == 0:
+            stats[RUIN_HAND] = hand_number + 1
+        if point < len(checkpoints) and checkpoints[point] == hand_number + 1:
+            path[point] = balance
+            point += 1
+        if mode <= EACH_SHOE and state[CARDS_DEALT] >= state[THRESHOLD]:
+            new_shoe(deck, state, mt, shoe)
+    for i in range(point, len(checkpoints)):
+        path[i] = balance
+    return balance
+
+tables = {}
+
+def kernel_tables():
+    """Card values and the basic-strategy decision table as arrays, built once"""
+    if not tables:
+        from .strategy import decision_table, build_decision_table
+        if not decision_table:
+            build_decision_table()
+        # Indexed by total, soft, has_ace, pair value, two cards and upcard, like hand_key()
+        action_table = np.full((22, 2, 2, 12, 2, 12), STAND, dtype=np.int64)
+        for ((total, soft, has_ace, pair_value, two_cards), upcard), (action, _) in decision_table.items():
+            action_table[total, int(soft), int(has_ace), pair_value, int(two_cards), upcard] = ACTION_CODES[action]
+        tables['card_value'] = np.array(CARD_VALUE, dtype=np.int64)
+        tables['action_table'] = action_table
+        tables['tags'] = {code: np.array(cls.tags, dtype=np.int64) for cls, code in STRATEGY_CODES.items()}
+        tables['tags'][0] = np.zeros(52, dtype=np.int64)
+    return tables
+
+def run_simulation(simulator, num_hands, use_basic_strategy, trajectory=None, histogram=None, balance=None):
+    """Runs simulator.run_simulation in the kernel, carrying shoe, count and RNG state in and out;
+    from `balance` instead of the initial balance if given, to go on with a run"""
+    ramp_units = np.array(getattr(simulator.strategy, 'ramp_units', ()), dtype=np.float64)
+    checkpoints = np.array(trajectory.checkpoints if trajectory is not None else [], dtype=np.int64)
+    path = np.zeros(len(checkpoints))
+    stats = np.zeros(3)
+    bins = NUM_BINS if histogram is not None else 0
+    counts, totals, squares = np.zeros(bins, dtype=np.int64), np.zeros(bins), np.zeros(bins)
+    balance = run_kernel(simulator, num_hands, use_basic_strategy,
+                         float(simulator.initial_balance if balance is None else balance),
+                         float(simulator.base_bet), ramp_units, checkpoints, path, stats, counts, totals, squares,
+                         np.zeros(0), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+    if trajectory is not None:
+        trajectory.add_run(path.tolist(), stats[MAX_DRAWDOWN], int(stats[RUIN_HAND]), balance)
+    if histogram is not None:
+        histogram.merge(CountHistogram(counts.tolist(), totals.tolist(), squares.tolist()))
+    return balance
+
+def hand_stream(simulator, num_hands, use_basic_strategy, flat=True):
+    """simulator.hand_stream in the kernel: results, count bins and shoe depths of num_hands hands as arrays"""
+    results, positions, ends = np.zeros(num_hands), np.zeros(num_hands, dtype=np.int64), np.zeros(num_hands, dtype=np.int64)
+    if flat or simulator.strategy is None:
+        base_bet, ramp_units = 1.0, np.ones(NUM_BINS)
+    else:
+        base_bet, ramp_units = float(simulator.base_bet), np.array(getattr(simulator.strategy, 'ramp_units', ()), dtype=np.float64)
+    run_kernel(simulator, num_hands, use_basic_strategy, math.inf, base_bet, ramp_units,
+               np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(3), np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0),
+               results, positions, ends)
+    return results, positions, ends
+
+def run_kernel(simulator, num_hands, use_basic_strategy, balance, base_bet, ramp_units, checkpoints, path, stats,
+               counts, totals, squares, results, positions, ends):
+    """Calls run_hands on the simulator's shoe, count and RNG state and writes that state back"""
+    strategy = simulator.strategy
+    code = strategy_code(strategy)
+    arrays = kernel_tables()
+
+    deck = np.zeros(RANK_BATCH if simulator.infinite_deck else simulator.nb_decks * 52, dtype=np.int64)
+    deck[:len(simulator.deck)] = simulator.deck
+    shoe = shoe_params(simulator.shoe, simulator.nb_decks * 52)
+    tray = np.zeros((3, simulator.nb_decks * 52), dtype=np.int64)  # Hand number, card, counted
+    for i, discard in enumerate(simulator.discards):
+        tray[:, i] = discard
+    state = np.zeros(10, dtype=np.int64)
+    state[DECK_LEN] = len(simulator.deck)
+    state[CARDS_DEALT] = simulator.cards_dealt
+    state[THRESHOLD] = simulator.reshuffle_threshold if shoe[SHOE_MODE] <= EACH_SHOE else -1
+    state[HAND_NUMBER] = simulator.hands_played
+    state[TRAY_LEN] = len(simulator.discards)
+    if strategy:
+        state[RUNNING_COUNT] = strategy.running_count
+        if code == 3:
+            state[SEEN_FIVES] = strategy.seen_fives
+            state[STRATEGY_CARDS] = strategy.cards_dealt
+    version, internal, gauss_next = simulator.rng.getstate()
+    mt = np.array(internal[:624], dtype=np.int64)
+    state[MT_INDEX] = internal[624]
+
+    balance = run_hands(num_hands, balance, deck, state, mt, shoe, tray,
+                        simulator.nb_decks, simulator.num_players, simulator.tracked_player_position,
+                        base_bet, use_basic_strategy, code,
+                        arrays['tags'][code], arrays['action_table'], arrays['card_value'],
+                        ramp_units, checkpoints, path, stats, counts, totals, squares, results, positions, ends)
+
+    simulator.rng.setstate((version, tuple(int(word) for word in mt) + (int(state[MT_INDEX]),), gauss_next))
+    simulator.deck = deck[:state[DECK_LEN]].tolist()
+    simulator.cards_dealt = int(state[CARDS_DEALT])
+    if shoe[SHOE_MODE] == EACH_SHOE:
+        simulator.reshuffle_threshold = int(state[THRESHOLD])
+    simulator.discards = [(int(tray[0, i % tray.shape[1]]), int(tray[1, i % tray.shape[1]]), bool(tray[2, i % tray.shape[1]]))
+                          for i in range(state[TRAY_START], state[TRAY_START] + state[TRAY_LEN])]
+    if strategy:
+        strategy.running_count = int(state[RUNNING_COUNT])
+        if code == 3:
+            strategy.seen_fives = int(state[SEEN_FIVES])
+            strategy.cards_dealt = int(state[STRATEGY_CARDS])
+    simulator.hands_played += int(stats[HANDS_PLAYED])
+    return balance
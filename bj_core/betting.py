@@ -0,0 +1,78 @@
+import hashlib
+import json
+import math
+import os
+from .cache import CACHE_DIR
+from .counting import COUNT_MIN, NUM_BINS, count_bin
+from .histogram import CountHistogram
+from .simulator import BlackjackSimulator, ENGINE_VERSION
+
+# Kelly bet sizing. A calibration run plays flat one-unit bets with basic strategy and
+# collects a CountHistogram of their results, i.e. the EV and variance per count bin. That
+# curve is cached on disk; a ramp turns it into a bet per bin, and strategies made by
+# kelly_strategy() size each bet with a single table index.
+
+def calibrate(strategy_class, nb_decks=6, num_players=1, tracked_player_position=0, num_hands=500000, seed=0):
+    """Plays num_hands flat one-unit hands with basic strategy and returns their CountHistogram"""
+    flat = type(f"Flat{strategy_class.__name__}", (RampBetting, strategy_class), {'ramp_units': [1] * NUM_BINS})
+    simulator = BlackjackSimulator(nb_decks=nb_decks, base_bet=1, initial_balance=math.inf, num_players=num_players,
+                                   tracked_player_position=tracked_player_position, seed=seed, backend='numba')
+    curve = CountHistogram()
+    simulator.run_simulation(flat, num_hands, use_basic_strategy=True, histogram=curve)
+    return curve
+
+def cached_curve(strategy_class, nb_decks=6, num_players=1, tracked_player_position=0, num_hands=500000, seed=0):
+    """calibrate(), read from CACHE_DIR when the same calibration has been run before"""
+    config = {'strategy': strategy_class.__name__, 'nb_decks': nb_decks, 'num_players': num_players,
+              'tracked_player_position': tracked_player_position, 'num_hands': num_hands, 'seed': seed,
+              'bins': [COUNT_MIN, NUM_BINS], 'version': ENGINE_VERSION}
+    key = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+    path = os.path.join(CACHE_DIR, f"ev_curve_{strategy_class.__name__}_{key}.json")
+    if os.path.exists(path):
+        with open(path) as file:
+            data = json.load(file)
+        return CountHistogram(data['hands'], data['totals'], data['squares'])
+
+    curve = calibrate(strategy_class, nb_decks, num_players, tracked_player_position, num_hands, seed)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(path + '.tmp', 'w') as file:
+        json.dump({'config': config, 'hands': curve.hands, 'totals': curve.totals, 'squares': curve.squares}, file)
+    os.replace(path + '.tmp', path)  # Readers never see a half-written file
+    return curve
+
+def kelly_ramp(curve, bankroll_units, fraction=0.5, min_units=1, max_units=16, min_hands=1000):
+    """Returns the bet in units for each count bin: fraction * (EV / variance) * bankroll, clamped.
+
+    Bins with fewer than min_hands hands keep the bet of the bin below, and the ramp never
+    decreases as the count rises, so sparse extreme bins can't produce erratic bets.
+    """
+    units = []
+    previous = min_units
+    for index in range(NUM_BINS):
+        bet = previous
+        variance = curve.variance(index)
+        if curve.hands[index] >= min_hands and variance > 0:
+            bet = fraction * curve.mean(index) / variance * bankroll_units
+            bet = max(previous, min(max(bet, min_units), max_units))
+        units.append(bet)
+        previous = bet
+    return units
+
+class RampBetting:
+    """Mixin that bets base_bet times ramp_units[bin of the system's bet index]"""
+    ramp_units = [1] * NUM_BINS
+
+    def calculate_bet(self, base_bet, nb_deck, cards_dealt):
+        return int(base_bet * self.ramp_units[count_bin(self.bet_index(nb_deck, cards_dealt))])
+
+def kelly_strategy(strategy_class, bankroll_units, fraction=0.5, nb_decks=6, num_players=1,
+                   tracked_player_position=0, calibration_hands=500000, min_units=1, max_units=16):
+    """Returns strategy_class with its fixed ramp replaced by a (fractional) Kelly ramp.
+
+    bankroll_units is the bankroll in base bets, e.g. initial_balance / base_bet. The result
+    can be passed to run_simulation like any strategy class.
+    """
+    curve = cached_curve(strategy_class, nb_decks, num_players, tracked_player_position, calibration_hands)
+    units = kelly_ramp(curve, bankroll_units, fraction, min_units, max_units)
+    return type(f"Kelly{strategy_class.__name__}", (RampBetting, strategy_class),
+                {'ramp_units': units, 'label': f"{strategy_class.label} {fraction:g} Kelly"})
@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+import time
+
+CACHE_DIR = os.environ.get('BJ_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'bj_core'))
+
+def config_key(config, version):
+    """Content address of a configuration: SHA-256 of its canonical JSON and the engine version"""
+    payload = json.dumps({'config': config, 'version': version}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ResultCache:
+    """On-disk results keyed by configuration hash, in one SQLite file.
+
+    Entries written by another engine version are dropped when the cache is opened. Once
+    the stored values exceed max_bytes, the least recently read or written entries are
+    evicted. Several processes can share one file.
+    """
+
+    def __init__(self, path=None, version=None, max_bytes=256 * 1024 * 1024):
+        import sqlite3  # Only processes that use a cache pay for it
+        if version is None:
+            from .simulator import ENGINE_VERSION
+            version = ENGINE_VERSION
+        self.path = path or os.path.join(CACHE_DIR, 'results.sqlite')
+        self.version = version
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, version TEXT, '
+                                    'value TEXT, size INTEGER, last_used REAL)')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+            self.connection.execute('DELETE FROM results WHERE version != ?', (str(version),))
+
+    def key(self, config):
+        return config_key(config, self.version)
+
+    def get(self, config):
+        """Returns the value stored for config, or None"""
+        key = self.key(config)
+        row = self.connection.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        with self.connection:
+            self.connection.execute('UPDATE results SET last_used = ? WHERE key = ?', (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, config, value):
+        data = json.dumps(value)
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                                    (self.key(config), str(self.version), data, len(data), time.time()))
+            self.evict()
+
+    def evict(self):
+        """Drops least recently used entries until the stored values fit in max_bytes"""
+        total = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.connection.execute('SELECT key, size FROM results ORDER BY last_used').fetchall():
+            self.connection.execute('DELETE FROM results WHERE key = ?', (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute('DELETE FROM results')
+
+    def close(self):
+        self.connection.close()
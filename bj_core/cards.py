@@ -0,0 +1,46 @@
+# A card is an int: rank index + 13 * suit index. card % 13 is the rank and card // 13 the
+# suit, so per-card facts (value, count tag, ...) are plain list lookups indexed by the card.
+
+SUITS = ['clubs', 'diamonds', 'hearts', 'spades']
+RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'jack', 'queen', 'king', 'ace']
+RANK_VALUES = [2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 11]
+CARD_VALUES = dict(zip(RANKS, RANK_VALUES))  # Value by rank name
+ACE = RANKS.index('ace')
+FIVE = RANKS.index('5')
+
+CARD_VALUE = [RANK_VALUES[card % 13] for card in range(52)]
+
+def make_card(rank, suit):
+    return RANKS.index(rank) + 13 * SUITS.index(suit)
+
+def card_name(card):
+    """Returns the (rank, suit) names of a card, e.g. for looking up its image"""
+    return (RANKS[card % 13], SUITS[card // 13])
+
+def build_shoe(nb_decks):
+    """Returns an unshuffled shoe, suit by suit and rank by rank within each deck"""
+    return list(range(52)) * nb_decks
+
+RANK_BATCH = 1024  # Random words drawn at a time for an infinite deck
+
+def draw_ranks(rng, words=RANK_BATCH):
+    """Cards of an infinite deck: ranks 0-12 with equal odds, i.e. each card value weighted as in a
+    real deck, from `words` 32-bit outputs of rng. Like rng.randrange(13) per card, a word's top
+    four bits are its rank and words of 13 and up are skipped, but the words come in one call.
+    Returned in reverse, so pop() deals them in order."""
+    data = rng.getrandbits(32 * words).to_bytes(4 * words, 'little')
+    return [byte >> 4 for byte in data[-1::-4] if byte < 13 << 4]  # The high byte of each word
+
+def hand_value(hand):
+    """Returns the best total of a hand, counting aces as 1 where 11 would bust"""
+    result = 0
+    aces = 0
+    for card in hand:
+        value = CARD_VALUE[card]
+        if value == 11:
+            aces += 1
+        result += value
+    while result > 21 and aces:
+        result -= 10
+        aces -= 1
+    return result
@@ -0,0 +1,149 @@
+import math
+import os
+import struct
+import sys
+import time
+from array import array
+from .cache import config_key
+from .simulator import ENGINE_VERSION
+
+# Snapshots of a run in progress, so that a run_simulation or run_multiple_simulations killed
+# part way picks up where it stopped and ends with exactly the result it would have had.
+#
+# A snapshot is one little-endian binary record, a few kilobytes at most: the run's identity
+# (hash of everything its result depends on), how far it got, the tracked balance, the count,
+# the random generator (624 Mersenne Twister words) and the shoe, dealt cards and discards
+# (hand numbers, cards and whether each was counted).
+# run_multiple_simulations' finished runs ride along as one float64 each.
+
+MAGIC = b'BJCP'
+FORMAT = 2
+# key, runs finished, hand, balance, balance is an int, hands played, running count, fives
+# seen, cards counted, cards dealt, reshuffle threshold (-1: none), gauss_next present,
+# gauss_next, cards in the shoe, discards, runs' final balances
+HEAD = struct.Struct('<4sB32sQQdBQqqqqqBdIII')
+MT_WORDS = 625  # 624 words and the position in them
+
+def little_endian(values):
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+class Checkpoint:
+    """Periodic snapshots of a simulation to `path`, and resumption from them.
+
+    Pass one to run_simulation or run_multiple_simulations as checkpoint=. If `path` holds a
+    snapshot of the same run (same simulator settings, seed and starting shoe, strategy and
+    sizes), the run continues from it; a snapshot of any other run raises ValueError. While
+    running, a snapshot is written between slices of `hands` hands once `every` seconds have
+    passed since the last one. The file is replaced atomically, so a kill never leaves half a
+    snapshot, and removed once the run is over. Runs with a trajectory or histogram can't be
+    checkpointed.
+    """
+
+    def __init__(self, path, every=5.0, hands=16384):
+        self.path = path
+        self.every = every
+        self.hands = hands
+        self.depth = 0  # Nested start() calls: run_multiple_simulations around run_simulation
+        self.key = None
+        self.pending = None  # The snapshot loaded by start(), until resume() applies it
+        self.final_balances = []
+        self.next_write = 0.0
+        self.writes = 0
+
+    def start(self, config):
+        """Begins a run whose result depends on config; loads a snapshot of it if there is one"""
+        self.depth += 1
+        if self.depth > 1:
+            return
+        self.key = bytes.fromhex(config_key(config, f'{ENGINE_VERSION}/{FORMAT}'))
+        self.final_balances = []
+        self.pending = None
+        self.next_write = time.monotonic() + self.every
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as file:
+                self.pending = self.decode(file.read())
+            self.final_balances = self.pending['final_balances']
+
+    def stop(self, finished):
+        self.depth -= 1
+        if self.depth == 0 and finished and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def resume(self, simulator):
+        """Returns (hands played, balance) to continue the current run from, restoring the
+        simulator to the snapshot if it was taken during this run"""
+        snapshot = self.pending
+        if snapshot is None or snapshot['runs'] != len(self.final_balances):
+            return 0, simulator.initial_balance
+        self.pending = None
+        simulator.rng.setstate((3, tuple(snapshot['mt']), snapshot['gauss_next']))
+        simulator.deck = snapshot['deck']
+        simulator.cards_dealt = snapshot['cards_dealt']
+        simulator.reshuffle_threshold = snapshot['reshuffle_threshold']
+        simulator.discards = snapshot['discards']
+        simulator.hands_played = snapshot['hands_played']
+        strategy = simulator.strategy
+        if strategy is not None:
+            strategy.running_count = snapshot['running_count']
+            if hasattr(strategy, 'seen_fives'):
+                strategy.seen_fives = snapshot['seen_fives']
+                strategy.cards_dealt = snapshot['strategy_cards']
+        return snapshot['hand'], snapshot['balance']
+
+    def tick(self, simulator, hand, balance):
+        """Called between slices of a run; writes a snapshot if one is due"""
+        if time.monotonic() >= self.next_write:
+            self.write(simulator, hand, balance)
+
+    def write(self, simulator, hand, balance):
+        temporary = self.path + '.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(self.encode(simulator, hand, balance))
+        os.replace(temporary, self.path)
+        self.writes += 1
+        self.next_write = time.monotonic() + self.every
+
+    def encode(self, simulator, hand, balance):
+        version, internal, gauss_next = simulator.rng.getstate()
+        strategy = simulator.strategy
+        threshold = simulator.reshuffle_threshold
+        head = HEAD.pack(MAGIC, FORMAT, self.key, len(self.final_balances), hand, balance, isinstance(balance, int),
+                         simulator.hands_played, strategy.running_count if strategy else 0,
+                         getattr(strategy, 'seen_fives', 0), getattr(strategy, 'cards_dealt', 0), simulator.cards_dealt,
+                         -1 if threshold == math.inf else threshold, gauss_next is not None, gauss_next or 0.0,
+                         len(simulator.deck), len(simulator.discards), len(self.final_balances))
+        return b''.join([head, little_endian(array('I', internal)).tobytes(), bytes(simulator.deck),
+                         little_endian(array('Q', [hand_number for hand_number, _, _ in simulator.discards])).tobytes(),
+                         bytes(card for _, card, _ in simulator.discards),
+                         bytes(counted for _, _, counted in simulator.discards),
+                         little_endian(array('d', self.final_balances)).tobytes()])
+
+    def decode(self, data):
+        (magic, version, key, runs, hand, balance, integral, hands_played, running_count, seen_fives, strategy_cards,
+         cards_dealt, threshold, has_gauss, gauss_next, deck_len, discards_len, finals_len) = HEAD.unpack_from(data)
+        if magic != MAGIC or version != FORMAT:
+            raise ValueError(f"{self.path} is not a simulation checkpoint")
+        if key != self.key:
+            raise ValueError(f"{self.path} is a checkpoint of another run; remove it to start this one")
+        offset = HEAD.size
+
+        def take(typecode, count):
+            nonlocal offset
+            values = array(typecode)
+            values.frombytes(data[offset:offset + count * values.itemsize])
+            offset += count * values.itemsize
+            return little_endian(values).tolist()
+
+        mt = take('I', MT_WORDS)
+        deck = take('B', deck_len)
+        hand_numbers = take('Q', discards_len)
+        cards = take('B', discards_len)
+        discards = list(zip(hand_numbers, cards, map(bool, take('B', discards_len))))
+        final_balances = take('d', finals_len)
+        return {'runs': runs, 'hand': hand, 'balance': int(balance) if integral else balance, 'hands_played': hands_played,
+                'running_count': running_count, 'seen_fives': seen_fives, 'strategy_cards': strategy_cards,
+                'cards_dealt': cards_dealt, 'reshuffle_threshold': math.inf if threshold < 0 else threshold,
+                'gauss_next': gauss_next if has_gauss else None, 'mt': mt, 'deck': deck, 'discards': discards,
+                'final_balances': final_balances}
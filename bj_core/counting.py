@@ -0,0 +1,132 @@
+import math
+from abc import ABC, abstractmethod
+from .cards import RANKS, FIVE
+
+# Bet sizing and calibration bin counts to integers; counts beyond the ends share the end bins
+COUNT_MIN, COUNT_MAX = -10, 10
+NUM_BINS = COUNT_MAX - COUNT_MIN + 1
+
+def count_bin(index):
+    """Returns the bin of a count: its floor, offset from COUNT_MIN and clamped to the table"""
+    position = math.floor(index) - COUNT_MIN
+    if position < 0:
+        return 0
+    if position >= NUM_BINS:
+        return NUM_BINS - 1
+    return position
+
+def card_tags(tags_by_rank):
+    """Expands {rank name: tag} into a table indexed by card; unlisted ranks count 0"""
+    return [tags_by_rank.get(RANKS[card % 13], 0) for card in range(52)]
+
+class CardCountingStrategy(ABC):
+    label = 'Running'
+    tags = [0] * 52
+
+    def __init__(self, nb_deck=1):
+        self.nb_deck = nb_deck
+        self.running_count = 0
+
+    def update_count(self, card):
+        """Adds one card to the count in constant time"""
+        self.running_count += self.tags[card]
+
+    def uncount(self, card):
+        """Takes a counted card back off the count, once a continuous shuffler has it again"""
+        self.running_count -= self.tags[card]
+
+    def count_hand(self, hand):
+        tags = self.tags
+        for card in hand:
+            self.running_count += tags[card]
+
+    def reset(self):
+        self.running_count = 0
+
+    def true_count(self, nb_deck, cards_dealt):
+        decks_remaining = max(((nb_deck * 52) - cards_dealt) / 52, 1e-6)
+        return self.running_count / decks_remaining
+
+    def bet_index(self, nb_deck, cards_dealt):
+        """The figure this system sizes its bets by; the true count unless the system says otherwise"""
+        return self.true_count(nb_deck, cards_dealt)
+
+    @abstractmethod
+    def calculate_bet(self, base_bet, nb_deck, cards_dealt):
+        pass
+
+class HiLowStrategy(CardCountingStrategy):
+    label = 'Hi-Lo'
+    tags = card_tags({'2': 1, '3': 1, '4': 1, '5': 1, '6': 1, '10': -1, 'jack': -1, 'queen': -1, 'king': -1, 'ace': -1})
+
+    def calculate_bet(self, base_bet, nb_deck, cards_dealt):
+        true_count = self.true_count(nb_deck, cards_dealt)
+        if true_count <= 1:
+            return int(base_bet)
+        elif true_count < 3:
+            return int(base_bet * 2)
+        else:
+            return int(base_bet * 4)
+
+class KOStrategy(CardCountingStrategy):
+    label = 'KO'
+    tags = card_tags({'2': 1, '3': 1, '4': 1, '5': 1, '6': 1, '7': 1, '10': -1, 'jack': -1, 'queen': -1, 'king': -1, 'ace': -1})
+
+    def bet_index(self, nb_deck, cards_dealt):
+        return self.running_count  # KO is unbalanced and bets on the running count
+
+    def calculate_bet(self, base_bet, nb_deck, cards_dealt):
+        # KO strategy does not convert to true count
+        if self.running_count <= 1:
+            return int(base_bet)
+        elif self.running_count < 3:
+            return int(base_bet * 2)
+        else:
+            return int(base_bet * 4)
+
+class FiveCountStrategy(CardCountingStrategy):
+    label = 'Fives seen'
+
+    def __init__(self, nb_deck=1):
+        super().__init__(nb_deck)
+        self.total_fives = nb_deck * 4   # Total number of fives in the deck(s)
+        self.seen_fives = 0
+        self.total_cards = nb_deck * 52  # Total number of cards in the deck(s)
+        self.cards_dealt = 0             # Cards this strategy has counted
+
+    def update_count(self, card):
+        if card % 13 == FIVE:
+            self.seen_fives += 1
+            self.running_count = self.seen_fives
+        self.cards_dealt += 1
+
+    def uncount(self, card):
+        if card % 13 == FIVE:
+            self.seen_fives -= 1
+            self.running_count = self.seen_fives
+        self.cards_dealt -= 1
+
+    def count_hand(self, hand):
+        for card in hand:
+            self.update_count(card)
+
+    def reset(self):
+        super().reset()
+        self.seen_fives = 0
+        self.cards_dealt = 0
+
+    def calculate_bet(self, base_bet, nb_deck, cards_dealt):
+        unseen_fives = self.total_fives - self.seen_fives
+        unseen_cards = self.total_cards - self.cards_dealt
+
+        if unseen_fives == 0:
+            return int(base_bet)  # Avoid division by zero
+
+        count_ratio = unseen_cards / unseen_fives
+
+        if count_ratio > 14:
+            return int(base_bet * 4)  # Bet more if ratio is higher
+        elif count_ratio < 12:
+            return int(base_bet * 0.5)  # Bet less if ratio is lower
+        else:
+            return int(base_bet)
@@ -0,0 +1,355 @@
+import random
+from .cards import CARD_VALUE, build_shoe, hand_value
+from .counting import HiLowStrategy, KOStrategy, FiveCountStrategy
+from .shoes import RandomCut
+from .strategy import hand_key, strategy_advice
+
+# Game rules and state for the pygame front end. Nothing in this module draws, waits or
+# polls for events: the renderer subscribes as an observer and input arrives through
+# place_bet() and act(), so whole rounds can also be played headless by a ScriptedPlayer.
+
+ACTIONS = ['hit', 'stand', 'double', 'split']
+
+class BlackjackEngine:
+    def __init__(self, num_players, player_position, num_decks, strategy_choice, initial_bet, initial_balance=1000, seed=None, shoe=None):
+        """Sets up the table; the phase moves betting -> dealing -> player_turn -> round_over (or game_over).
+        shoe places the cut card: a cut-card model from shoes.py, by default a new random depth every shoe."""
+        self.num_players = num_players
+        self.nb_deck = num_decks
+        self.player_index = player_position - 1
+        self.dealer_index = num_players  # Dealer is the last in the hands list
+        self.base_bet = initial_bet
+        self.current_bet = initial_bet
+        self.player_balance = initial_balance
+        self.rng = random.Random(seed)
+        self.shoe = shoe or RandomCut(each_shoe=True)
+        if self.shoe.deals:
+            raise ValueError("The game deals from a real shoe; use a cut-card model")
+        self.observers = []
+
+        # Initialize Strategy; without one the HUD still keeps a Hi-Lo count
+        self.strategy = None
+        self.choose_strategy(strategy_choice)
+        self.counter = self.strategy if self.strategy else HiLowStrategy(self.nb_deck)
+
+        # Round state
+        self.hands = [[] for _ in range(num_players + 1)]  # Players + Dealer
+        self.player_hands = []  # The human's hands, two after a split
+        self.player_bets = []   # One bet per hand in player_hands
+        self.current_hand_index = 0
+        self.dealer_hidden_card = None
+        self.hole_card_hidden = False
+        self.round_result = ''
+        self.last_round_change = 0
+        self.round_number = 0
+        self.advice_key = None  # Hand and upcard the cached advice belongs to
+        self.cached_advice = None
+        self.wealth = [self.player_balance]
+        self.phase = 'betting'
+
+        self.deck = []
+        self.cards_dealt = 0
+        self.reshuffle_threshold = 0
+        self.reshuffle_cards()
+
+    def add_observer(self, observer):
+        """Registers an object whose on_<event> methods are called as the game progresses"""
+        self.observers.append(observer)
+
+    def notify(self, event, *args):
+        for observer in self.observers:
+            handler = getattr(observer, 'on_' + event, None)
+            if handler is not None:
+                handler(self, *args)
+
+    def choose_strategy(self, choice):
+        strategies = {
+            1: None,  # No strategy
+            2: HiLowStrategy,
+            3: KOStrategy,
+            4: FiveCountStrategy
+        }
+        strategy_class = strategies.get(choice, None)
+        if strategy_class is not None:
+            self.strategy = strategy_class(self.nb_deck)
+        else:
+            self.strategy = None
+
+    def create_deck(self):
+        return build_shoe(self.nb_deck)
+
+    def reshuffle_cards(self):
+        self.deck = self.create_deck()
+        self.rng.shuffle(self.deck)
+        self.cards_dealt = 0
+        self.reshuffle_threshold = self.shoe.threshold(self.rng, len(self.deck))
+        self.counter.reset()  # Reset the count for the new shoe
+        self.notify('shuffle')
+
+    def draw_from_shoe(self):
+        if self.cards_dealt >= self.reshuffle_threshold or not self.deck:
+            self.reshuffle_cards()
+        self.cards_dealt += 1
+        return self.deck.pop()
+
+    def deal_card(self, hand, seat):
+        card = self.draw_from_shoe()
+        hand.append(card)
+        self.counter.update_count(card)
+        self.notify('card_dealt', seat, card)
+        return card
+
+    def deal_hidden_card(self, hand):
+        """Deals the dealer's hole card; it is only counted once revealed"""
+        card = self.draw_from_shoe()
+        hand.append(card)
+        self.dealer_hidden_card = card
+        self.hole_card_hidden = True
+        self.notify('card_dealt', self.dealer_index, None)
+
+    def reveal_dealer_card(self):
+        if self.hole_card_hidden:
+            self.hole_card_hidden = False
+            self.counter.update_count(self.dealer_hidden_card)
+            self.notify('hole_card_revealed', self.dealer_hidden_card)
+
+    def suggested_bet(self):
+        """Returns the strategy's bet for the next round, or the base bet without a strategy"""
+        if self.strategy:
+            return self.strategy.calculate_bet(self.base_bet, self.nb_deck, self.cards_dealt)
+        return self.base_bet
+
+    def count_summary(self):
+        """Returns the HUD figures; all come from the incremental counter, so this is O(1) per call"""
+        decks_remaining = ((self.nb_deck * 52) - self.cards_dealt) / 52
+        return {
+            'label': self.counter.label,
+            'running_count': self.counter.running_count,
+            'true_count': self.counter.true_count(self.nb_deck, self.cards_dealt),
+            'decks_remaining': decks_remaining,
+            'recommended_bet': self.suggested_bet()
+        }
+
+    def advice(self):
+        """Basic strategy advice for the active hand, looked up again only when that hand or the upcard changes"""
+        # The decision table's own key, so a split hand is never served its pair's advice
+        hand = self.active_hand()
+        key = (hand_key(hand), CARD_VALUE[self.dealer_upcard_hand()[0]])
+        if key != self.advice_key:
+            self.advice_key = key
+            self.cached_advice = strategy_advice(hand, self.dealer_upcard_hand())
+        return self.cached_advice
+
+    def active_hand(self):
+        return self.player_hands[self.current_hand_index]
+
+    def dealer_upcard_hand(self):
+        """Returns only the dealer cards the players can see"""
+        dealer_hand = self.hands[self.dealer_index]
+        return dealer_hand[:1] if self.hole_card_hidden else dealer_hand
+
+    def place_bet(self, bet):
+        """Places the bet for the next round and deals it; returns False if the bet is refused"""
+        if self.phase not in ('betting', 'round_over'):
+            return False
+        if bet is None or bet <= 0 or bet > self.player_balance:
+            return False
+        self.current_bet = bet
+        self.start_round()
+        return True
+
+    def start_round(self):
+        self.hands = [[] for _ in range(self.num_players + 1)]
+        self.player_hands = [self.hands[self.player_index]]
+        self.player_bets = [self.current_bet]
+        self.current_hand_index = 0
+        self.round_result = ''
+        self.last_round_change = 0
+        self.round_number += 1
+        self.phase = 'dealing'
+        self.initial_deal()
+
+        # Seats before the human play first
+        for index in range(self.player_index):
+            self.play_bot(index)
+
+        self.phase = 'player_turn'
+        if self.check_blackjack(self.active_hand()):
+            self.notify('blackjack')
+            self.finish_player_turn()
+        else:
+            self.notify('turn', self.player_index)
+
+    def initial_deal(self):
+        """Deals two cards to each player and the dealer, whose second card stays hidden"""
+        for index, hand in enumerate(self.hands):
+            self.deal_card(hand, index)
+            if index == self.dealer_index:
+                self.deal_hidden_card(hand)
+            else:
+                self.deal_card(hand, index)
+
+    def check_blackjack(self, hand):
+        return len(hand) == 2 and hand_value(hand) == 21
+
+    def play_bot(self, index):
+        """Bots at the other seats play like the dealer"""
+        hand = self.hands[index]
+        while hand_value(hand) < 17:
+            self.deal_card(hand, index)
+
+    def legal_actions(self):
+        if self.phase != 'player_turn':
+            return []
+        hand = self.active_hand()
+        committed = sum(self.player_bets)
+        bet = self.player_bets[self.current_hand_index]
+        actions = ['hit', 'stand']
+        if len(hand) == 2 and self.player_balance >= committed + bet:
+            actions.append('double')
+            if len(self.player_hands) == 1 and hand[0] % 13 == hand[1] % 13:
+                actions.append('split')
+        return actions
+
+    def act(self, action):
+        """Applies the human's action; returns False if it is not allowed right now"""
+        if action not in self.legal_actions():
+            return False
+        hand = self.active_hand()
+        if action == 'hit':
+            self.deal_card(hand, self.player_index)
+            if hand_value(hand) >= 21:
+                self.next_hand()  # End turn if player hits 21 or busts
+        elif action == 'stand':
+            self.next_hand()
+        elif action == 'double':
+            self.player_bets[self.current_hand_index] *= 2
+            self.deal_card(hand, self.player_index)
+            self.next_hand()
+        elif action == 'split':
+            bet = self.player_bets[0]
+            self.player_hands = [[hand[0]], [hand[1]]]
+            self.player_bets = [bet, bet]
+            self.hands[self.player_index] = self.player_hands[0]
+            for split_hand in self.player_hands:
+                self.deal_card(split_hand, self.player_index)
+            self.notify('turn', self.player_index)
+        return True
+
+    def next_hand(self):
+        self.current_hand_index += 1
+        if self.current_hand_index < len(self.player_hands):
+            self.notify('turn', self.player_index)
+        else:
+            self.finish_player_turn()
+
+    def finish_player_turn(self):
+        self.current_hand_index = len(self.player_hands) - 1
+        for index in range(self.player_index + 1, self.num_players):
+            self.play_bot(index)
+        self.handle_dealer_action()
+        self.calculate_round_results()
+
+    def handle_dealer_action(self):
+        self.reveal_dealer_card()
+        dealer_hand = self.hands[self.dealer_index]
+        while hand_value(dealer_hand) < 17:
+            self.deal_card(dealer_hand, self.dealer_index)
+        self.notify('dealer_done')
+
+    def calculate_round_results(self):
+        """Settles every hand of the human against the dealer and ends the round"""
+        dealer_hand = self.hands[self.dealer_index]
+        dealer_total = hand_value(dealer_hand)
+        split = len(self.player_hands) > 1
+        change = 0
+        results = []
+        for hand, bet in zip(self.player_hands, self.player_bets):
+            player_total = hand_value(hand)
+            if player_total > 21:
+                change -= bet
+                results.append("You bust!")
+            elif not split and self.check_blackjack(hand):
+                if self.check_blackjack(dealer_hand):
+                    results.append("Tie with the dealer.")
+                else:
+                    change += 1.5 * bet
+                    results.append("You get BLACKJACK!")
+            elif dealer_total > 21 or player_total > dealer_total:
+                change += bet
+                results.append("You win!")
+            elif player_total < dealer_total:
+                change -= bet
+                results.append("You lose!")
+            else:
+                results.append("Tie with the dealer.")
+
+        self.player_balance += change
+        self.last_round_change = change
+        self.round_result = " / ".join(results)
+        self.wealth.append(self.player_balance)
+        self.phase = 'game_over' if self.player_balance <= 0 else 'round_over'
+        self.notify('round_settled')
+
+class ScriptedPlayer:
+    def __init__(self, bets=None, actions=None, policy='dealer', default_bet=8):
+        """Stands in for the mouse and keyboard: replays scripted bets and actions, then follows the policy"""
+        self.bets = iter(bets) if bets is not None else iter(())
+        self.actions = iter(actions) if actions is not None else iter(())
+        self.policy = policy  # 'dealer' hits below 17, 'basic' follows basic strategy
+        self.default_bet = default_bet
+
+    def choose_bet(self, engine):
+        bet = next(self.bets, None)
+        if bet is None:
+            bet = engine.suggested_bet() or self.default_bet
+            bet = min(bet, int(engine.player_balance))
+        return bet
+
+    def choose_action(self, engine):
+        legal = engine.legal_actions()
+        action = next(self.actions, None)
+        if action in legal:
+            return action
+        hand = engine.active_hand()
+        if self.policy == 'basic':
+            action = engine.advice()[0]
+            if action in legal:
+                return action
+            return 'hit' if action in ('double', 'split') and hand_value(hand) < 17 else 'stand'
+        return 'hit' if hand_value(hand) < 17 else 'stand'
+
+def run_headless(engine, player, num_rounds):
+    """Plays up to num_rounds rounds without a renderer and returns the balance change of each round"""
+    changes = []
+    for _ in range(num_rounds):
+        if engine.phase == 'game_over' or not engine.place_bet(player.choose_bet(engine)):
+            break
+        while engine.phase == 'player_turn':
+            engine.act(player.choose_action(engine))
+        changes.append(engine.last_round_change)
+    return changes
+
+def validate_against_simulator(num_rounds=10000, num_decks=1, base_bet=8, seed=None):
+    """Plays the same flat-bet, dealer-style hands in the GUI engine and in BlackjackSimulator and compares the average result per hand"""
+    from .simulator import BlackjackSimulator
+
+    initial_balance = base_bet * num_rounds * 2  # Large enough that neither side can go broke
+    engine = BlackjackEngine(1, 1, num_decks, 1, base_bet, initial_balance=initial_balance, seed=seed)
+    changes = run_headless(engine, ScriptedPlayer(default_bet=base_bet), num_rounds)
+    gui_mean = sum(changes) / len(changes)
+    variance = sum((change - gui_mean) ** 2 for change in changes) / max(len(changes) - 1, 1)
+
+    simulator = BlackjackSimulator(nb_decks=num_decks, base_bet=base_bet, initial_balance=initial_balance, num_players=1, seed=seed)
+    final_balance = simulator.run_simulation(None, num_hands=num_rounds, use_basic_strategy=False)
+    simulator_mean = (final_balance - initial_balance) / num_rounds
+
+    std_error = (2 * variance / len(changes)) ** 0.5  # Of the difference between two independent means
+    return {
+        'rounds': len(changes),
+        'gui_mean': gui_mean,
+        'simulator_mean': simulator_mean,
+        'difference': gui_mean - simulator_mean,
+        'std_error': std_error,
+        'consistent': abs(gui_mean - simulator_mean) <= 3 * std_error
+    }
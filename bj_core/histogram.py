@@ -0,0 +1,64 @@
+import csv
+import math
+from .counting import COUNT_MIN, NUM_BINS
+
+class CountHistogram:
+    """Hands played, total won and sum of squared results per count bin.
+
+    Pass one to run_simulation or run_multiple_simulations as histogram=. Each hand is binned
+    by count_bin() of the strategy's bet_index() when the bet is made: the true count, or the
+    running count for KO. Without a strategy every hand lands in the zero bin. Histograms from
+    different runs or processes combine with merge(), which is plain element-wise addition.
+    """
+
+    def __init__(self, hands=None, totals=None, squares=None):
+        self.hands = list(hands) if hands is not None else [0] * NUM_BINS
+        self.totals = list(totals) if totals is not None else [0.0] * NUM_BINS
+        self.squares = list(squares) if squares is not None else [0.0] * NUM_BINS
+
+    def add(self, index, result):
+        self.hands[index] += 1
+        self.totals[index] += result
+        self.squares[index] += result * result
+
+    def merge(self, other):
+        for index in range(NUM_BINS):
+            self.hands[index] += other.hands[index]
+            self.totals[index] += other.totals[index]
+            self.squares[index] += other.squares[index]
+        return self
+
+    def mean(self, index):
+        return self.totals[index] / self.hands[index] if self.hands[index] else 0.0
+
+    def variance(self, index):
+        hands = self.hands[index]
+        if hands < 2:
+            return math.nan
+        mean = self.totals[index] / hands
+        return (self.squares[index] - hands * mean * mean) / (hands - 1)
+
+    def rows(self):
+        """(count, hands, mean result, variance) for every bin that saw hands"""
+        return [(COUNT_MIN + index, self.hands[index], self.mean(index), self.variance(index))
+                for index in range(NUM_BINS) if self.hands[index]]
+
+    def to_csv(self, filename):
+        """Writes the raw sums per non-empty bin, enough to rebuild or merge the histogram later"""
+        with open(filename, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['Count', 'Hands', 'Total Won', 'Sum of Squares', 'Mean', 'Variance'])
+            for count, hands, mean, variance in self.rows():
+                index = count - COUNT_MIN
+                writer.writerow([count, hands, self.totals[index], self.squares[index], mean, variance])
+
+    @classmethod
+    def from_csv(cls, filename):
+        histogram = cls()
+        with open(filename, newline='') as file:
+            for row in csv.DictReader(file):
+                index = int(row['Count']) - COUNT_MIN
+                histogram.hands[index] = int(row['Hands'])
+                histogram.totals[index] = float(row['Total Won'])
+                histogram.squares[index] = float(row['Sum of Squares'])
+        return histogram
@@ -0,0 +1,120 @@
+import time
+
+PHASES = ('shuffle', 'deal', 'decide', 'dealer', 'count', 'settle')
+# Simulator methods timed for each phase; what's left of a run (bets, bookkeeping) is 'other'
+PHASE_METHODS = {'create_deck': 'shuffle', 'deal_card': 'deal', 'play_seats': 'decide',
+                 'play_dealer': 'dealer', 'count_cards': 'count', 'settle': 'settle'}
+
+class Instrument:
+    """Progress reports, phase timings and profiles of simulation runs.
+
+    Pass one to run_simulation or run_multiple_simulations as instrument=; without one the
+    simulator runs exactly as before. progress(hands, elapsed) is called every `every` hands.
+    phases=True times the simulator's phases (self time, so dealing during a decision counts
+    as 'deal'); the numba kernel can't be timed from inside, so it then runs in Python.
+    profile=True runs cProfile and memory=True tracemalloc over the runs. report() returns
+    everything as a dict of plain values, ready for JSON.
+    """
+
+    def __init__(self, progress=None, every=10000, phases=False, profile=False, memory=False, top=15):
+        self.progress = progress
+        self.every = every
+        self.phases = phases
+        self.top = top
+        self.hands = 0
+        self.runs = 0
+        self.elapsed = 0.0
+        self.backend = None
+        self.next_report = every
+        self.depth = 0  # Nested start() calls: run_multiple_simulations around run_simulation
+        self.seconds = dict.fromkeys(PHASES + ('other',), 0.0)
+        self.calls = dict.fromkeys(PHASES, 0)
+        self.phase = 'other'
+        self.profiler = None
+        self.memory = None
+        if profile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+        if memory:
+            self.memory = {'peak_bytes': 0, 'top': []}
+
+    def start(self, simulator):
+        self.depth += 1
+        if self.depth > 1:
+            return
+        self.backend = 'python' if self.phases else simulator.backend
+        self.started = time.perf_counter()
+        if self.phases:
+            self.mark = self.started
+            for name, phase in PHASE_METHODS.items():
+                setattr(simulator, name, self.timed(phase, getattr(simulator, name)))
+        if self.memory is not None:
+            import tracemalloc
+            self.started_tracing = not tracemalloc.is_tracing()
+            if self.started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def stop(self, simulator):
+        self.depth -= 1
+        if self.depth:
+            return
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self.phases:
+            self.switch('other')
+            for name in PHASE_METHODS:
+                delattr(simulator, name)  # Back to the class methods
+        if self.memory is not None:
+            import tracemalloc
+            self.memory['peak_bytes'] = max(self.memory['peak_bytes'], tracemalloc.get_traced_memory()[1])
+            statistics = tracemalloc.take_snapshot().statistics('lineno')[:self.top]
+            self.memory['top'] = [{'line': str(stat.traceback[0]), 'bytes': stat.size, 'blocks': stat.count}
+                                  for stat in statistics]
+            if self.started_tracing:
+                tracemalloc.stop()
+        self.elapsed += time.perf_counter() - self.started
+
+    def timed(self, phase, method):
+        def wrapper(*args, **kwargs):
+            outer = self.phase
+            self.calls[phase] += 1
+            self.switch(phase)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.switch(outer)
+        return wrapper
+
+    def switch(self, phase):
+        """Charges the time since the last switch to the current phase, then enters `phase`"""
+        now = time.perf_counter()
+        self.seconds[self.phase] += now - self.mark
+        self.mark = now
+        self.phase = phase
+
+    def add_hands(self, hands):
+        self.hands += hands
+        if self.progress is not None and self.hands >= self.next_report:
+            self.next_report = (self.hands // self.every + 1) * self.every
+            self.progress(self.hands, self.elapsed + time.perf_counter() - self.started)
+
+    def report(self):
+        report = {'backend': self.backend, 'runs': self.runs, 'hands': self.hands, 'elapsed': self.elapsed,
+                  'hands_per_second': self.hands / self.elapsed if self.elapsed else 0.0}
+        if self.phases:
+            report['phases'] = {phase: {'seconds': seconds, 'calls': self.calls.get(phase, 0),
+                                        'share': seconds / self.elapsed if self.elapsed else 0.0}
+                                for phase, seconds in self.seconds.items()}
+        if self.profiler is not None:
+            import pstats
+            stats = pstats.Stats(self.profiler).stats
+            rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+            report['profile'] = [{'function': f"{filename}:{line}({name})", 'calls': calls, 'self_seconds': self_time,
+                                  'cumulative_seconds': cumulative}
+                                 for (filename, line, name), (_, calls, self_time, cumulative, _) in rows]
+        if self.memory is not None:
+            report['memory'] = self.memory
+        return report
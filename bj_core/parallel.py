@@ -0,0 +1,236 @@
+import hashlib
+import math
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+import numpy as np
+from .counting import NUM_BINS
+from .histogram import CountHistogram
+from .simulator import BlackjackSimulator
+from .trajectory import BankrollTracker
+
+# run_multiple_simulations over worker processes. Workers write what each simulation produced
+# into one shared-memory block at offsets fixed by the simulation's index (count histograms go
+# to a slot per chunk), so nothing but the hands played travels back through the pool's pipes
+# and the parent reduces numpy views of the block in place.
+# run_for() plays for a time budget instead of a number of simulations; its chunks are sized
+# as it goes and come back through the pool, since nobody knows ahead how many there will be.
+
+ATTACH = {'track': False} if sys.version_info >= (3, 13) else {}  # Attach without tracking, where Python can
+
+class SharedResults:
+    """Per-simulation results of a parallel run, laid out in one multiprocessing.shared_memory block.
+
+    balances[i] is simulation i's final balance; with points > 0, paths[i], drawdowns[i] and
+    ruin_hands[i] hold what a BankrollTracker needs of it; with slots > 0, histograms[slot]
+    holds the hands, totals and squares per count bin of one chunk of simulations. Create it in
+    the parent before starting the workers, attach() in the workers by name, and close() (then
+    unlink() in the parent).
+    """
+
+    def __init__(self, simulations, points=0, slots=0, name=None):
+        self.shape = (simulations, points, slots)
+        sizes = [simulations, simulations * points, simulations, simulations, slots * 3 * NUM_BINS]
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=max(8 * sum(sizes), 8))
+        else:
+            # Only the creator tracks the block (and unregisters it on unlink). Before Python 3.13
+            # attaching registers it too (bpo-39959), harmlessly: pool workers share the parent's
+            # resource tracker, as long as the block exists before they start
+            self.memory = shared_memory.SharedMemory(name=name, **ATTACH)
+        views = []
+        offset = 0
+        for size in sizes:
+            views.append(np.ndarray(size, dtype=np.float64, buffer=self.memory.buf, offset=8 * offset))
+            offset += size
+        self.balances, paths, self.drawdowns, self.ruin_hands, histograms = views
+        self.paths = paths.reshape(simulations, points)
+        self.histograms = histograms.reshape(slots, 3, NUM_BINS)
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    @classmethod
+    def attach(cls, name, simulations, points=0, slots=0):
+        return cls(simulations, points, slots, name)
+
+    def close(self):
+        del self.balances, self.paths, self.drawdowns, self.ruin_hands, self.histograms  # Views pin the buffer
+        self.memory.close()
+
+    def unlink(self):
+        self.memory.unlink()
+
+def simulation_seed(seed, index):
+    """Seed of simulation `index` of a parallel run, so results don't depend on how the work is split"""
+    return int.from_bytes(hashlib.sha256(f"{seed}/{index}".encode()).digest()[:8], 'little')
+
+class RunRecorder(BankrollTracker):
+    """A BankrollTracker that keeps the last run's path instead of folding it into the sketches"""
+
+    def add_run(self, path, max_drawdown, ruin_hand, final_balance):
+        self.last_run = (path, max_drawdown, ruin_hand)
+
+def run_chunk(name, shape, *chunk):
+    """play_chunk() in a worker process, on the parent's shared block"""
+    results = SharedResults.attach(name, *shape)
+    try:
+        return play_chunk(results, *chunk)
+    finally:
+        results.close()
+
+def play_chunk(results, options, strategy_class, num_hands, use_basic_strategy, seed, first, count, slot):
+    """Plays simulations first .. first + count - 1 into results; returns the hands played"""
+    simulations, points, slots = results.shape
+    simulator = BlackjackSimulator(**options)
+    recorder = RunRecorder(num_hands, points) if points else None
+    histogram = CountHistogram() if slots else None
+    for index in range(first, first + count):
+        simulator.restart(simulation_seed(seed, index))
+        results.balances[index] = simulator.run_simulation(strategy_class, num_hands, use_basic_strategy,
+                                                           trajectory=recorder, histogram=histogram)
+        if recorder is not None:
+            path, max_drawdown, ruin_hand = recorder.last_run
+            results.paths[index, :len(path)] = path
+            results.paths[index, len(path):] = results.balances[index]
+            results.drawdowns[index] = max_drawdown
+            results.ruin_hands[index] = ruin_hand
+    if histogram is not None:
+        results.histograms[slot] = [histogram.hands, histogram.totals, histogram.squares]
+    return simulator.hands_played
+
+def run_parallel(strategy_class, num_simulations=1000, num_hands=1000, use_basic_strategy=False, seed=0,
+                 workers=None, chunk_size=None, trajectory=None, histogram=None, **options):
+    """run_multiple_simulations of BlackjackSimulator(**options) on `workers` processes; returns the average.
+
+    Simulation i starts from its own seed (simulation_seed), so the average and the collectors
+    come out the same for any number of workers or chunk size. A BankrollTracker passed as
+    trajectory and a CountHistogram passed as histogram are filled as by run_multiple_simulations.
+    """
+    workers = workers or os.cpu_count()
+    chunk_size = chunk_size or max(1, -(-num_simulations // (4 * workers)))
+    chunks = [(first, min(chunk_size, num_simulations - first)) for first in range(0, num_simulations, chunk_size)]
+    points = len(trajectory.checkpoints) if trajectory is not None else 0
+    shape = (num_simulations, points, len(chunks) if histogram is not None else 0)
+    results = SharedResults(*shape)
+    try:
+        arguments = [(options, strategy_class, num_hands, use_basic_strategy, seed, first, count, slot)
+                     for slot, (first, count) in enumerate(chunks)]
+        if workers <= 1:
+            for chunk in arguments:
+                play_chunk(results, *chunk)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for future in [pool.submit(run_chunk, results.name, shape, *chunk) for chunk in arguments]:
+                    future.result()
+        average = float(np.maximum(results.balances, 0).sum()) / num_simulations
+        if histogram is not None:
+            hands, totals, squares = results.histograms.sum(axis=0)
+            histogram.merge(CountHistogram(hands.astype(np.int64).tolist(), totals.tolist(), squares.tolist()))
+        if trajectory is not None:
+            for index in range(num_simulations):
+                trajectory.add_run(results.paths[index].tolist(), float(results.drawdowns[index]),
+                                   int(results.ruin_hands[index]), float(results.balances[index]))
+    finally:
+        results.close()
+        results.unlink()
+    return average
+
+def play_until(options, strategy_class, num_hands, use_basic_strategy, seed, first, count, deadline):
+    """Plays simulations first .. first + count - 1 until the wall clock reaches deadline (simulation
+    0 always gets played); returns the final balance and hands of each one played, in order"""
+    simulator = BlackjackSimulator(**options)
+    runs = []
+    start = time.perf_counter()
+    for index in range(first, first + count):
+        if index and time.time() >= deadline:
+            break
+        hands_played = simulator.hands_played
+        simulator.restart(simulation_seed(seed, index))
+        balance = simulator.run_simulation(strategy_class, num_hands, use_basic_strategy)
+        runs.append((balance, simulator.hands_played - hands_played))
+    return runs, time.perf_counter() - start
+
+def run_for(strategy_class, seconds=5.0, num_hands=1000, use_basic_strategy=False, seed=0, workers=None,
+            confidence=0.95, chunk_seconds=0.25, **options):
+    """run_multiple_simulations of BlackjackSimulator(**options) for as many simulations as fit in
+    `seconds` of wall-clock time on `workers` processes (one per CPU by default).
+
+    Chunks of simulations are sized from the throughput measured so far: about chunk_seconds of
+    work each, and less as the deadline nears. Workers stop between simulations once it has
+    passed, so the run overshoots by at most one simulation per worker; simulation 0 is played
+    whatever the budget, so there is always an estimate. Simulation i has the same seed as in
+    run_parallel, and the estimate covers simulations 0 .. n - 1 for the largest n that all
+    finished, so it equals run_parallel(num_simulations=n) with the same seed.
+
+    Returns a dict: the average final balance, its confidence interval (normal approximation,
+    nan bounds from fewer than two simulations) and standard error, the simulations and hands
+    behind the estimate, and the seconds and workers it took.
+    """
+    start = time.perf_counter()
+    deadline = time.time() + seconds
+    workers = workers or os.cpu_count()
+    chunks = {}  # First simulation -> [(final balance, hands)] of a finished chunk
+    submitted = {}  # First simulation -> size of the chunk
+    measured = [0, 0.0]  # Simulations played and the seconds they took, over all workers
+
+    def finished(first, result):
+        runs, busy = result
+        chunks[first] = runs
+        measured[0] += len(runs)
+        measured[1] += busy
+
+    def chunk_size():
+        if not measured[0]:
+            return 1  # Measure first
+        seconds_left = max(deadline - time.time(), 0.0)
+        return max(1, int(measured[0] / measured[1] * min(chunk_seconds, seconds_left / 2)))
+
+    if workers <= 1:
+        submitted[0] = sys.maxsize
+        finished(0, play_until(options, strategy_class, num_hands, use_basic_strategy, seed, 0, sys.maxsize, deadline))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            running = {}
+            next_first = 0
+            while True:
+                while (time.time() < deadline or not submitted) and len(running) < 2 * workers:
+                    count = chunk_size()  # Two per worker, so none waits on the parent between chunks
+                    running[pool.submit(play_until, options, strategy_class, num_hands, use_basic_strategy, seed,
+                                        next_first, count, deadline)] = next_first
+                    submitted[next_first] = count
+                    next_first += count
+                if not running:
+                    break
+                seconds_left = deadline - time.time()
+                if seconds_left <= 0:
+                    for future, first in running.items():
+                        if first:
+                            future.cancel()  # Chunks that haven't started never will; simulation 0's always does
+                done, _ = wait(running, timeout=seconds_left if seconds_left > 0 else None, return_when=FIRST_COMPLETED)
+                for future in done:
+                    first = running.pop(future)
+                    if not future.cancelled():
+                        finished(first, future.result())
+
+    # The longest run of simulations from 0 that all finished
+    balances = []
+    hands = 0
+    for first in sorted(submitted):
+        runs = chunks.get(first, [])
+        balances.extend(balance for balance, _ in runs)
+        hands += sum(run_hands for _, run_hands in runs)
+        if len(runs) < submitted[first]:
+            break
+    balances = np.maximum(np.array(balances, dtype=np.float64), 0)
+    average = float(balances.sum()) / len(balances)  # Summed as run_parallel sums
+    error = statistics.stdev(balances.tolist()) / math.sqrt(len(balances)) if len(balances) > 1 else math.nan
+    half_width = statistics.NormalDist().inv_cdf((1 + confidence) / 2) * error
+    elapsed = time.perf_counter() - start
+    return {'average': average, 'low': average - half_width, 'high': average + half_width, 'confidence': confidence,
+            'standard_error': error, 'simulations': len(balances), 'hands': hands, 'seconds': elapsed,
+            'hands_per_second': hands / elapsed if elapsed else 0.0, 'workers': workers}
@@ -0,0 +1,36 @@
+import math
+import numpy as np
+from .counting import NUM_BINS
+from .histogram import CountHistogram
+from .shoes import CutCard
+from .simulator import BlackjackSimulator
+
+# Penetration sweeps. Up to a cut card, a shoe deals the same cards whatever the cut's depth,
+# so one stream of hands played to the deepest cut holds the hands of every shallower cut
+# too: each depth takes the hands of every shoe that were over before its cut card came out.
+
+def penetration_sweep(strategy_class, penetrations, nb_decks=6, num_players=1, tracked_player_position=0,
+                      num_hands=1000000, base_bet=1, use_basic_strategy=True, seed=0, backend='numba'):
+    """Returns {penetration: CountHistogram of the tracked seat's results} from a single pass.
+
+    The hands are played once with CutCard(max(penetrations)) and the strategy's own bets. The
+    deepest cut gets every hand; a shallower one gets the hands that ended at or before its
+    depth, so it leaves out the one hand per shoe that would have straddled its cut card and
+    sees fewer hands in all.
+    """
+    shoe_size = nb_decks * 52
+    simulator = BlackjackSimulator(nb_decks=nb_decks, base_bet=base_bet, initial_balance=math.inf, num_players=num_players,
+                                   tracked_player_position=tracked_player_position, seed=seed, backend=backend,
+                                   shoe=CutCard(max(penetrations)))
+    results, positions, ends = (np.asarray(column) for column in
+                                simulator.hand_stream(strategy_class, num_hands, use_basic_strategy, flat=False))
+    deepest = int(max(penetrations) * shoe_size)
+    histograms = {}
+    for penetration in penetrations:
+        depth = int(penetration * shoe_size)
+        played = (ends >= 0) & (ends <= depth) if depth < deepest else np.ones(len(ends), dtype=bool)
+        hands = np.bincount(positions[played], minlength=NUM_BINS)
+        totals = np.bincount(positions[played], weights=results[played], minlength=NUM_BINS)
+        squares = np.bincount(positions[played], weights=results[played] ** 2, minlength=NUM_BINS)
+        histograms[penetration] = CountHistogram(hands.tolist(), totals.tolist(), squares.tolist())
+    return histograms
@@ -0,0 +1,26 @@
+import numpy as np
+
+BLOCK = 4096  # Hands settled per step, bounding memory at len(ramps) * BLOCK floats
+
+def settle_ramps(results, positions, ramps, base_bet, initial_balance):
+    """Final balance of each ramp over one run's stream of one-unit results and count bins.
+
+    A ramp's bet is int(base_bet * units) for the bin of the hand, as RampBetting bets; its
+    balance stops at the first hand that takes it to zero or below, as run_simulation does.
+    """
+    results = np.asarray(results, dtype=np.float64)
+    positions = np.asarray(positions, dtype=np.int64)
+    bets = (base_bet * np.asarray(ramps, dtype=np.float64)).astype(np.int64).astype(np.float64)
+    balances = np.full(len(bets), float(initial_balance))
+    alive = balances > 0
+    for start in range(0, len(results), BLOCK):
+        if not alive.any():
+            break
+        outcomes = bets[:, positions[start:start + BLOCK]] * results[start:start + BLOCK]
+        path = balances[:, None] + np.cumsum(outcomes, axis=1)
+        ruined = path <= 0
+        ruin = alive & ruined.any(axis=1)
+        balances = np.where(alive, path[:, -1], balances)
+        balances[ruin] = path[ruin, ruined[ruin].argmax(axis=1)]
+        alive &= ~ruin
+    return balances.tolist()
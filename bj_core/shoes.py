@@ -0,0 +1,96 @@
+import math
+from .cards import draw_ranks
+
+# How the shoe is shuffled and how deep it is dealt. Pass one to BlackjackSimulator as shoe=.
+# Cut-card models only place the cut card: threshold() gives the number of cards dealt before
+# the next shuffle. Models with deals = True hand out every card themselves through deal().
+# accel.py mirrors each model, so all of them run in the compiled kernel too.
+
+class RandomCut:
+    """The cut card goes between low and high of the way into the shoe, at a random depth.
+
+    By default the depth is drawn once per simulator, as the simulator always did; with
+    each_shoe=True it is drawn again at every shuffle, as the pygame game does.
+    """
+    deals = False
+
+    def __init__(self, low=0.6, high=0.9, each_shoe=False):
+        self.low = low
+        self.high = high
+        self.each_shoe = each_shoe
+
+    def threshold(self, rng, shoe_size):
+        return rng.randint(int(self.low * shoe_size), int(self.high * shoe_size))
+
+class CutCard:
+    """A cut card at the same depth in every shoe, e.g. CutCard(0.75) for 75% penetration"""
+    deals = False
+    each_shoe = False
+
+    def __init__(self, penetration=0.75):
+        self.penetration = penetration
+
+    def threshold(self, rng, shoe_size):
+        return int(self.penetration * shoe_size)
+
+class ContinuousShuffler:
+    """A continuous shuffling machine: never shuffled up, its discards go back in instead.
+
+    The cards of a hand wait in the discard tray until `delay` more hands have started, then
+    each is inserted at a random place among the cards still in the machine (sooner, oldest
+    first, if the machine runs dry). cards_dealt is the number of cards out of the machine, so
+    true counts are taken against what is left in it. Running counts are never reset: a counted
+    card comes off the count when it goes back in, so the count covers the cards out of the
+    machine only.
+    """
+    deals = True
+    each_shoe = False
+
+    def __init__(self, delay=2):
+        if delay < 1:
+            raise ValueError("delay must be at least one hand")
+        self.delay = delay
+
+    def threshold(self, rng, shoe_size):
+        return math.inf
+
+    def deal(self, simulator):
+        deck = simulator.deck
+        discards = simulator.discards
+        returning = simulator.hands_played - self.delay
+        while discards and (discards[0][0] <= returning or not deck):
+            hand_number, card, counted = discards.pop(0)
+            if counted:
+                simulator.strategy.uncount(card)
+            deck.insert(simulator.rng.randrange(len(deck) + 1), card)
+        card = deck.pop()
+        discards.append((simulator.hands_played, card, False))
+        simulator.cards_dealt = len(discards)
+        return card
+
+    def count_cards(self, simulator, strategy, cards):
+        """Counts the cards of the hand just played that are still in the tray, marking each one
+        counted (the latest dealt of its kind) so that it comes off the count when it goes back in"""
+        discards = simulator.discards
+        for card in cards:
+            for i in range(len(discards) - 1, -1, -1):
+                hand_number, discard, counted = discards[i]
+                if hand_number != simulator.hands_played:
+                    break
+                if discard == card and not counted:
+                    discards[i] = (hand_number, card, True)
+                    strategy.update_count(card)
+                    break
+
+class InfiniteDeck:
+    """Ranks drawn independently with real-deck odds (see cards.draw_ranks): no shoe at all"""
+    deals = True
+    each_shoe = False
+
+    def threshold(self, rng, shoe_size):
+        return math.inf
+
+    def deal(self, simulator):
+        if not simulator.deck:
+            simulator.deck = draw_ranks(simulator.rng)
+        return simulator.deck.pop()
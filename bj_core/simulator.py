@@ -0,0 +1,387 @@
+import hashlib
+import json
+import random
+from .cards import build_shoe, hand_value
+from .counting import count_bin
+from .shoes import RandomCut, ContinuousShuffler, InfiniteDeck
+from .strategy import table_strategy
+
+BACKENDS = ('python', 'numba')
+ENGINE_VERSION = '2'  # Bump whenever a change alters the results of a seeded simulation
+
+class BlackjackSimulator:
+    def __init__(self, nb_decks=1, base_bet=8, initial_balance=1000, num_players=1, tracked_player_position=0, seed=None, backend='python', cache=None, infinite_deck=False, shoe=None):
+        """backend='numba' runs whole simulations in the compiled kernel of accel.py when numba is
+        installed and falls back to pure Python otherwise; self.backend says which one is in use.
+        With a ResultCache as cache, run_multiple_simulations reuses results stored for the same
+        configuration and starting shoe. shoe is a model from shoes.py, RandomCut() unless given:
+        a cut card, a continuous shuffler or an infinite deck. infinite_deck=True is short for
+        shoe=InfiniteDeck(), ranks drawn independently with real-deck odds: no shuffles or cut
+        card, so nothing to count, for quick reference runs of strategy_class=None."""
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+        self.nb_decks = nb_decks
+        self.base_bet = base_bet
+        self.initial_balance = initial_balance
+        self.num_players = num_players
+        self.tracked_player_position = tracked_player_position
+        self.cache = cache
+        self.backend = backend
+        self.shoe = shoe or (InfiniteDeck() if infinite_deck else RandomCut())
+        self.infinite_deck = isinstance(self.shoe, InfiniteDeck)
+        self.dealer = self.shoe if self.shoe.deals else None  # Deals every card itself
+        if backend == 'numba':
+            from . import accel
+            if not accel.available():
+                self.backend = 'python'
+        # A generator of our own, so seeded runs don't depend on (or disturb) the global random state
+        self.rng = random.Random()
+        self.strategy = None
+        self.hands = []
+        self.hands_played = 0  # Over all runs, for throughput reporting
+        self.restart(seed)
+
+    def restart(self, seed=None):
+        """Starts again from the shoe a new simulator with this seed would have"""
+        self.seed = seed
+        self.rng.seed(seed)
+        self.cards_dealt = 0
+        self.discards = []  # (hand number, card, counted) waiting to go back into a continuous shuffler
+        self.deck = [] if self.infinite_deck else self.create_deck()  # Ranks drawn but not dealt yet for an infinite deck
+        self.reshuffle_threshold = self.shoe.threshold(self.rng, len(self.deck))
+
+    def create_deck(self):
+        deck = build_shoe(self.nb_decks)
+        self.rng.shuffle(deck)
+        return deck
+
+    def reshuffle_cards(self):
+        self.deck = self.create_deck()
+        self.cards_dealt = 0
+        if self.shoe.each_shoe:
+            self.reshuffle_threshold = self.shoe.threshold(self.rng, len(self.deck))
+        if self.strategy:
+            self.strategy.reset()
+
+    def deal_card(self):
+        if self.dealer is not None:
+            return self.dealer.deal(self)
+        if len(self.deck) == 0 or self.cards_dealt >= self.reshuffle_threshold:
+            self.reshuffle_cards()
+        self.cards_dealt += 1
+        return self.deck.pop()
+
+    def play_hand(self, strategy, bet, use_basic_strategy=False):
+        if self.num_players == 1:
+            player_hand = [self.deal_card(), self.deal_card()]
+            dealer_hand = [self.deal_card(), self.deal_card()]
+            self.hands = [player_hand, dealer_hand]
+
+            # Check for blackjack
+            if hand_value(player_hand) == 21:
+                if hand_value(dealer_hand) == 21:
+                    return 0  # Tie
+                else:
+                    return 1.5 * bet  # Player wins with blackjack
+
+            return self.finish_hand(strategy, bet, use_basic_strategy, [player_hand], dealer_hand, 0)
+        else:
+            players_hands = [[self.deal_card(), self.deal_card()] for _ in range(self.num_players)]
+            dealer_hand = [self.deal_card(), self.deal_card()]
+            self.hands = players_hands + [dealer_hand]
+            return self.finish_hand(strategy, bet, use_basic_strategy, players_hands, dealer_hand, self.tracked_player_position)
+
+    def finish_hand(self, strategy, bet, use_basic_strategy, players_hands, dealer_hand, tracked):
+        """Plays out every seat and the dealer, counts the cards and settles the tracked seat"""
+        bet, double_down, split_hands, split_bets = self.play_seats(bet, use_basic_strategy, players_hands, dealer_hand, tracked)
+        self.play_dealer(dealer_hand)
+        if strategy:
+            self.count_cards(strategy, players_hands[tracked], dealer_hand)
+        return self.settle(bet, double_down, split_hands, split_bets, players_hands[tracked], dealer_hand)
+
+    def play_seats(self, bet, use_basic_strategy, players_hands, dealer_hand, tracked):
+        """Each seat's decisions; returns the tracked seat's bet, whether it doubled and its split hands and bets"""
+        double_down = False
+        split_hands = []
+        split_bets = []
+
+        for i, player_hand in enumerate(players_hands):
+            if hand_value(player_hand) == 21:
+                continue  # A natural in a multi-seat round is settled like any other 21
+            while True:
+                if use_basic_strategy and i == tracked:
+                    action = table_strategy(player_hand, dealer_hand)
+                else:
+                    action = 'hit' if hand_value(player_hand) < 17 else 'stand'
+
+                if action == 'hit':
+                    player_hand.append(self.deal_card())
+                    if hand_value(player_hand) >= 21:
+                        break
+                elif action == 'double' and i == tracked:
+                    double_down = True
+                    player_hand.append(self.deal_card())
+                    bet *= 2
+                    break
+                elif action == 'split' and i == tracked:
+                    split_hands.append([player_hand[0], self.deal_card()])
+                    split_hands.append([player_hand[1], self.deal_card()])
+                    split_bets.append(bet)
+                    split_bets.append(bet)
+                    bet *= 2
+                    break
+                else:
+                    break
+        return bet, double_down, split_hands, split_bets
+
+    def play_dealer(self, dealer_hand):
+        while hand_value(dealer_hand) < 17:
+            dealer_hand.append(self.deal_card())
+
+    def count_cards(self, strategy, tracked_hand, dealer_hand):
+        if isinstance(self.shoe, ContinuousShuffler):
+            self.shoe.count_cards(self, strategy, tracked_hand + dealer_hand)
+            return
+        strategy.count_hand(tracked_hand)
+        strategy.count_hand(dealer_hand)
+
+    def settle(self, bet, double_down, split_hands, split_bets, tracked_hand, dealer_hand):
+        """The tracked seat's result against the dealer"""
+        player_total = hand_value(tracked_hand)
+        dealer_total = hand_value(dealer_hand)
+
+        if split_hands:
+            results = []
+            for i, hand in enumerate(split_hands):
+                hand_total = hand_value(hand)
+                if hand_total > 21:
+                    results.append(-split_bets[i])
+                elif dealer_total > 21 or hand_total > dealer_total:
+                    results.append(split_bets[i])
+                elif hand_total < dealer_total:
+                    results.append(-split_bets[i])
+                else:
+                    results.append(0)
+            return sum(results)
+
+        if player_total > 21:
+            return -bet
+        elif dealer_total > 21 or player_total > dealer_total:
+            return bet if not double_down else 2 * bet
+        elif player_total < dealer_total:
+            return -bet if not double_down else -2 * bet
+        else:
+            return 0
+
+    def calculate_hand_value(self, hand):
+        return hand_value(hand)
+
+    def basic_strategy(self, player_hand, dealer_hand):
+        return table_strategy(player_hand, dealer_hand)
+
+    def new_strategy(self, strategy_class):
+        if strategy_class and self.infinite_deck:
+            raise ValueError("Card counting needs a finite shoe; use strategy_class=None with infinite_deck")
+        self.discards = [(hand_number, card, False) for hand_number, card, _ in self.discards]  # Nobody's count yet
+        return strategy_class(self.nb_decks) if strategy_class else None
+
+    def run_simulation(self, strategy_class, num_hands=1000, use_basic_strategy=False, trajectory=None, histogram=None, instrument=None, checkpoint=None):
+        """Plays one bankroll for up to num_hands hands and returns the final balance.
+        A BankrollTracker passed as trajectory follows the balance hand by hand; a
+        CountHistogram passed as histogram adds up each hand's result by count bin; an
+        Instrument passed as instrument reports progress and times or profiles the run; a
+        Checkpoint passed as checkpoint snapshots the run to disk and resumes it from there."""
+        self.strategy = self.new_strategy(strategy_class)
+        self.cards_dealt = 0
+        if checkpoint is not None:
+            if trajectory is not None or histogram is not None:
+                raise ValueError("A checkpointed run can't take a trajectory or histogram")
+            checkpoint.start(self.cache_config(strategy_class, None, num_hands, use_basic_strategy))
+        if instrument is not None:
+            instrument.start(self)
+        finished = False
+        try:
+            if checkpoint is not None:
+                balance = self.run_checkpointed(num_hands, use_basic_strategy, instrument, checkpoint)
+            elif self.backend == 'numba' and not (instrument is not None and instrument.phases) and self.kernel_supported():
+                from . import accel
+                hands_played = self.hands_played
+                balance = accel.run_simulation(self, num_hands, use_basic_strategy, trajectory, histogram)
+                if instrument is not None:
+                    instrument.add_hands(self.hands_played - hands_played)  # Once per kernel run
+            else:
+                balance = self.run_hands(self.initial_balance, num_hands, use_basic_strategy, trajectory, histogram, instrument)
+            finished = True
+            return balance
+        finally:
+            if instrument is not None:
+                instrument.runs += 1
+                instrument.stop(self)
+            if checkpoint is not None:
+                checkpoint.stop(finished)
+
+    def kernel_supported(self):
+        from . import accel
+        return accel.supports(self.strategy, self.shoe)
+
+    def run_checkpointed(self, num_hands, use_basic_strategy, instrument, checkpoint):
+        """run_simulation in slices of checkpoint.hands hands, from where the checkpoint left off.
+        Slices carry the whole state from one to the next, so the result is the same as in one go."""
+        hand, balance = checkpoint.resume(self)
+        kernel = self.backend == 'numba' and not (instrument is not None and instrument.phases) and self.kernel_supported()
+        while hand < num_hands and balance > 0:
+            count = min(checkpoint.hands, num_hands - hand)
+            if kernel:
+                from . import accel
+                hands_played = self.hands_played
+                balance = accel.run_simulation(self, count, use_basic_strategy, balance=balance)
+                if instrument is not None:
+                    instrument.add_hands(self.hands_played - hands_played)
+            else:
+                balance = self.run_hands(balance, count, use_basic_strategy, instrument=instrument)
+            hand += count
+            checkpoint.tick(self, hand, balance)
+        return balance
+
+    def run_hands(self, balance, num_hands, use_basic_strategy, trajectory=None, histogram=None, instrument=None):
+        """The pure Python hand loop of run_simulation"""
+        if trajectory is not None:
+            trajectory.start(balance)
+        for hand_number in range(num_hands):
+            if balance <= 0:
+                break
+            if histogram is not None:
+                index = count_bin(self.strategy.bet_index(self.nb_decks, self.cards_dealt) if self.strategy else 0)
+            bet = self.base_bet if not self.strategy else self.strategy.calculate_bet(self.base_bet, self.nb_decks, self.cards_dealt)
+            result = self.play_hand(self.strategy, bet, use_basic_strategy)
+            balance += result
+            self.hands_played += 1
+            if histogram is not None:
+                histogram.add(index, result)
+            if trajectory is not None:
+                trajectory.record(balance)
+            if instrument is not None:
+                instrument.add_hands(1)
+            if self.cards_dealt >= self.reshuffle_threshold:
+                self.reshuffle_cards()
+
+        if trajectory is not None:
+            trajectory.finish(balance)
+        return balance
+
+    def run_multiple_simulations(self, strategy_class, num_simulations=1000, num_hands=1000, use_basic_strategy=False, trajectory=None, histogram=None, instrument=None, checkpoint=None):
+        config = None
+        if self.cache is not None and trajectory is None and histogram is None and instrument is None and checkpoint is None:
+            config = self.cache_config(strategy_class, num_simulations, num_hands, use_basic_strategy)
+            cached = self.cache.get(config)
+            if cached is not None:
+                self.restore_shoe_state(cached['state'])
+                self.strategy = strategy_class(self.nb_decks) if strategy_class else None
+                return cached['average']
+
+        final_balances = []
+        if checkpoint is not None:
+            checkpoint.start(self.cache_config(strategy_class, num_simulations, num_hands, use_basic_strategy))
+            final_balances = checkpoint.final_balances  # Runs a resumed snapshot had already finished
+        if instrument is not None:
+            instrument.start(self)
+        finished = False
+        try:
+            for simulation_number in range(len(final_balances), num_simulations):
+                final_balance = self.run_simulation(strategy_class, num_hands, use_basic_strategy, trajectory, histogram, instrument, checkpoint)
+                final_balances.append(max(final_balance, 0))
+                if self.strategy:
+                    self.strategy.running_count = 0
+            finished = True
+        finally:
+            if instrument is not None:
+                instrument.stop(self)
+            if checkpoint is not None:
+                checkpoint.stop(finished)
+        average = sum(final_balances) / len(final_balances)
+
+        if config is not None:
+            self.cache.put(config, {'average': average, 'state': self.shoe_state()})
+        return average
+
+    def hand_stream(self, strategy_class, num_hands=1000, use_basic_strategy=False, flat=True):
+        """Plays num_hands hands of one run whatever the bankroll and returns each hand's result,
+        count bin and cards dealt from the shoe after it (-1 if the shoe was reshuffled during the
+        hand). Hands are played at one unit each, or with the strategy's own bets if not flat.
+        Bets never change the cards or the play, so a hand's result at any bet is the bet times
+        its flat result."""
+        self.strategy = self.new_strategy(strategy_class)
+        self.cards_dealt = 0
+        if self.backend == 'numba':
+            from . import accel
+            if accel.supports(self.strategy, self.shoe):
+                return accel.hand_stream(self, num_hands, use_basic_strategy, flat)
+        results = []
+        positions = []
+        ends = []
+        for hand_number in range(num_hands):
+            positions.append(count_bin(self.strategy.bet_index(self.nb_decks, self.cards_dealt) if self.strategy else 0))
+            bet = 1 if flat or not self.strategy else self.strategy.calculate_bet(self.base_bet, self.nb_decks, self.cards_dealt)
+            cards_dealt = self.cards_dealt
+            results.append(self.play_hand(self.strategy, bet, use_basic_strategy))
+            ends.append(self.cards_dealt if self.cards_dealt > cards_dealt else -1)
+            self.hands_played += 1
+            if self.cards_dealt >= self.reshuffle_threshold:
+                self.reshuffle_cards()
+        return results, positions, ends
+
+    def run_multiple_ramps(self, strategy_class, ramps, num_simulations=1000, num_hands=1000, use_basic_strategy=False):
+        """run_multiple_simulations for many bet ramps at once; returns the average final balance of each.
+
+        Each ramp gives the bet in base bets per count bin, like RampBetting.ramp_units; the
+        strategy only keeps the count. Every run's hands are played once and settled for all
+        ramps together, each ramp stopping at its own ruin. Within a run each ramp gets exactly
+        what run_simulation with that ramp would; the next run continues the shoe after
+        num_hands hands, so ramps share the same cards instead of each drawing its own.
+        """
+        from .ramps import settle_ramps
+        final_balances = []
+        for simulation_number in range(num_simulations):
+            results, positions, _ = self.hand_stream(strategy_class, num_hands, use_basic_strategy)
+            final_balances.append(settle_ramps(results, positions, ramps, self.base_bet, self.initial_balance))
+            if self.strategy:
+                self.strategy.running_count = 0
+        return [sum(max(balances[ramp], 0) for balances in final_balances) / num_simulations for ramp in range(len(ramps))]
+
+    def cache_config(self, strategy_class, num_simulations, num_hands, use_basic_strategy):
+        """Everything a run_multiple_simulations result depends on, including the shoe it starts from"""
+        start = json.dumps(self.shoe_state(), sort_keys=True)
+        return {
+            'nb_decks': self.nb_decks,
+            'base_bet': self.base_bet,
+            'initial_balance': self.initial_balance,
+            'num_players': self.num_players,
+            'tracked_player_position': self.tracked_player_position,
+            'seed': self.seed,
+            'shoe': {'model': type(self.shoe).__name__, **vars(self.shoe)},
+            'strategy': f"{strategy_class.__module__}.{strategy_class.__qualname__}" if strategy_class else None,
+            'ramp_units': list(getattr(strategy_class, 'ramp_units', [])),
+            'num_simulations': num_simulations,
+            'num_hands': num_hands,
+            'use_basic_strategy': use_basic_strategy,
+            'start': hashlib.sha256(start.encode()).hexdigest()
+        }
+
+    def shoe_state(self):
+        """What one run hands on to the next: the random generator, the shoe and the cards dealt from it"""
+        version, internal, gauss_next = self.rng.getstate()
+        return {
+            'rng': [version, list(internal), gauss_next],
+            'deck': list(self.deck),
+            'cards_dealt': self.cards_dealt,
+            'reshuffle_threshold': self.reshuffle_threshold,
+            'discards': [list(discard) for discard in self.discards]
+        }
+
+    def restore_shoe_state(self, state):
+        version, internal, gauss_next = state['rng']
+        self.rng.setstate((version, tuple(internal), gauss_next))
+        self.deck = list(state['deck'])
+        self.cards_dealt = state['cards_dealt']
+        self.reshuffle_threshold = state['reshuffle_threshold']
+        self.discards = [tuple(discard) for discard in state.get('discards', [])]
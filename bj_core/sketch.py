@@ -0,0 +1,86 @@
+import bisect
+import math
+
+class TDigest:
+    """Merging t-digest: approximate quantiles of a stream in memory bounded by the compression"""
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = []    # Centroids, sorted by mean
+        self.weights = []
+        self.buffer = []   # (value, weight) pairs not yet merged into the centroids
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, weight=1):
+        self.buffer.append((value, weight))
+        self.count += weight
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if len(self.buffer) >= 5 * self.compression:
+            self.compress()
+
+    def merge(self, other):
+        """Folds another digest into this one, as if its values had been added here"""
+        self.buffer.extend(zip(other.means, other.weights))
+        self.buffer.extend(other.buffer)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.compress()
+
+    def scale(self, q):
+        """k1 scale function: centroids stay small near the tails, where precision matters"""
+        return self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    def compress(self):
+        if not self.buffer:
+            return
+        points = sorted(list(zip(self.means, self.weights)) + self.buffer)
+        self.buffer = []
+        means = []
+        weights = []
+        total = self.count
+        merged_weight = 0  # Weight of the centroids already emitted
+        mean, weight = points[0]
+        k_low = self.scale(0.0)
+        for value, value_weight in points[1:]:
+            if self.scale((merged_weight + weight + value_weight) / total) - k_low <= 1:
+                weight += value_weight
+                mean += (value - mean) * value_weight / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                merged_weight += weight
+                k_low = self.scale(merged_weight / total)
+                mean, weight = value, value_weight
+        means.append(mean)
+        weights.append(weight)
+        self.means = means
+        self.weights = weights
+
+    def quantile(self, q):
+        """Returns the estimated q-quantile (0 <= q <= 1), or nan if nothing was added"""
+        self.compress()
+        if not self.means:
+            return math.nan
+        if len(self.means) == 1:
+            return self.means[0]
+        target = q * self.count
+        # Each centroid's mean sits at the middle of its weight; interpolate between those points
+        centers = []
+        cumulative = 0
+        for weight in self.weights:
+            centers.append(cumulative + weight / 2)
+            cumulative += weight
+        if target <= centers[0]:
+            return self.min + (self.means[0] - self.min) * (target / centers[0] if centers[0] else 1)
+        if target >= centers[-1]:
+            tail = self.count - centers[-1]
+            return self.means[-1] + (self.max - self.means[-1]) * ((target - centers[-1]) / tail if tail else 1)
+        i = bisect.bisect_right(centers, target) - 1
+        fraction = (target - centers[i]) / (centers[i + 1] - centers[i])
+        return self.means[i] + (self.means[i + 1] - self.means[i]) * fraction
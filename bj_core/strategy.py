@@ -0,0 +1,259 @@
+from functools import lru_cache
+from .cards import CARD_VALUE
+
+def basic_strategy(player_hand, dealer_hand):
+    """Returns the basic strategy action for a hand against the dealer's upcard"""
+    player_total, _, has_ace, pair_value, can_double = hand_key(player_hand)
+    ace_pair = pair_value == 11
+    return basic_strategy_action(player_total, CARD_VALUE[dealer_hand[0]], has_ace, pair_value > 0, can_double, ace_pair)
+
+def basic_strategy_action(player_total, dealer_value, has_ace, pair, can_double, ace_pair):
+    """The basic strategy ladder, written against the hand features hand_key() extracts"""
+    # Check for soft hand (Ace as 11)
+    soft = has_ace and player_total <= 21
+
+    if player_total < 8:
+        return 'hit'
+
+    if player_total == 8:
+        if dealer_value in [2, 3, 4, 7, 8, 9, 10, 11]:
+            return 'hit'
+        else:
+            return 'double'
+
+    if player_total == 9:
+        if dealer_value in [7, 8, 9, 10, 11]:
+            return 'hit'
+        elif can_double:
+            return 'double'
+        else:
+            return 'hit'
+
+    if player_total == 10:
+        if dealer_value in [10, 11] or not can_double:
+            return 'hit'
+        return 'double'
+
+    if player_total == 11:
+        if can_double:
+            return 'double'
+        else:
+            return 'hit'
+
+    if player_total == 12:
+        if dealer_value in [2, 3, 7, 8, 9, 10, 11]:
+            return 'hit'
+        return 'stand'
+
+    if player_total in [13, 14, 15, 16]:
+        if dealer_value in [2, 3, 4, 5, 6]:
+            return 'stand'
+        return 'hit'
+
+    if player_total >= 17:
+        return 'stand'
+
+    if soft:
+
+        if player_total in [13, 14, 15, 16] and can_double:
+            if dealer_value in [4, 5, 6]:
+                return 'double'
+            return 'hit'
+
+        if player_total == 17:
+            if dealer_value in [2, 3, 4, 5, 6] and can_double:
+                return 'double'
+            return 'hit'
+
+        if player_total == 18:
+            if dealer_value in [3, 4, 5, 6] and can_double:
+                return 'double'
+            if dealer_value in [2, 7, 8, 11]:
+                return 'stand'
+            return 'hit'
+
+        if player_total == 19:
+            if dealer_value == 6 and can_double:
+                return 'double'
+            return 'stand'
+
+        if player_total == 20:
+            return 'stand'
+
+    if pair:
+
+        if player_total == 4:
+            if dealer_value in [3, 4, 5, 6, 7]:
+                return 'split'
+            return 'hit'
+
+        if player_total == 6:
+            if dealer_value in [4, 5, 6, 7]:
+                return 'split'
+            return 'hit'
+
+        if player_total == 8:
+            if dealer_value in [5, 6]:
+                return 'double'
+            return 'hit'
+
+        if player_total == 10:
+            if dealer_value in [10, 11]:
+                return 'hit'
+            return 'double'
+
+        if player_total ==12:
+            if dealer_value in [2, 3, 4, 5, 6]:
+                return 'split'
+            return 'hit'
+
+        if player_total == 14:
+            if dealer_value in [8, 9, 11]:
+                return 'hit'
+            if dealer_value == 10:
+                return 'stand'
+            return 'split'
+
+        if player_total == 18:
+            if dealer_value in [7, 10, 11]:
+                return 'stand'
+            return 'split'
+
+        if player_total == 20:
+            return 'stand'
+
+        if player_total == 16 or ace_pair:
+            return 'split'
+
+def hand_key(hand):
+    """Returns (total, soft, has_ace, pair_value, two_cards): everything a strategy decision looks at"""
+    hard_total = 0
+    has_ace = False
+    for card in hand:
+        value = CARD_VALUE[card]
+        if value == 11:
+            has_ace = True
+            value = 1
+        hard_total += value
+    soft = has_ace and hard_total + 10 <= 21
+    total = hard_total + 10 if soft else hard_total
+    two_cards = len(hand) == 2
+    pair_value = CARD_VALUE[hand[0]] if two_cards and hand[0] % 13 == hand[1] % 13 else 0
+    return (total, soft, has_ace, pair_value, two_cards)
+
+# Expected values behind the advice overlay, computed for an infinite shoe with the engine's
+# rules: the dealer stands on all 17s, doubling is allowed on any two cards, including after
+# the single split allowed per round, and a split 21 pays even money.
+
+CARD_PROBABILITIES = {2: 1 / 13, 3: 1 / 13, 4: 1 / 13, 5: 1 / 13, 6: 1 / 13, 7: 1 / 13,
+                      8: 1 / 13, 9: 1 / 13, 10: 4 / 13, 11: 1 / 13}
+
+def add_card(total, soft, value):
+    """Adds a card value to a (total, soft) hand, where soft means an ace still counts as 11"""
+    if value == 11:
+        if soft or total + 11 > 21:
+            total += 1  # A second ace, or one that would bust, counts as 1
+        else:
+            total += 11
+            soft = True
+    else:
+        total += value
+    if total > 21 and soft:
+        total -= 10
+        soft = False
+    return total, soft
+
+@lru_cache(maxsize=None)
+def dealer_outcomes(total, soft):
+    """Returns {final total: probability} for a dealer drawing to 17; 22 stands for a bust"""
+    if total > 21:
+        return {22: 1.0}
+    if total >= 17:
+        return {total: 1.0}
+    outcomes = {}
+    for value, probability in CARD_PROBABILITIES.items():
+        for final, final_probability in dealer_outcomes(*add_card(total, soft, value)).items():
+            outcomes[final] = outcomes.get(final, 0) + probability * final_probability
+    return outcomes
+
+@lru_cache(maxsize=None)
+def stand_ev(total, upcard):
+    if total > 21:
+        return -1.0
+    ev = 0.0
+    for final, probability in dealer_outcomes(upcard, upcard == 11).items():
+        if final == 22 or total > final:
+            ev += probability
+        elif total < final:
+            ev -= probability
+    return ev
+
+@lru_cache(maxsize=None)
+def hit_ev(total, soft, upcard):
+    """EV of taking a card and then standing or hitting, whichever is better"""
+    ev = 0.0
+    for value, probability in CARD_PROBABILITIES.items():
+        new_total, new_soft = add_card(total, soft, value)
+        if new_total > 21:
+            ev -= probability
+        else:
+            ev += probability * max(stand_ev(new_total, upcard), hit_ev(new_total, new_soft, upcard))
+    return ev
+
+def double_ev(total, soft, upcard):
+    return 2 * sum(probability * stand_ev(add_card(total, soft, value)[0], upcard)
+                   for value, probability in CARD_PROBABILITIES.items())
+
+@lru_cache(maxsize=None)
+def split_ev(pair_value, upcard):
+    """EV of splitting, playing each hand with stand, hit or double (no resplits)"""
+    ev = 0.0
+    for value, probability in CARD_PROBABILITIES.items():
+        total, soft = add_card(pair_value, pair_value == 11, value)
+        ev += probability * max(stand_ev(total, upcard), hit_ev(total, soft, upcard), double_ev(total, soft, upcard))
+    return 2 * ev
+
+decision_table = {}
+
+def build_decision_table():
+    """Fills decision_table with (action, {action: EV}) for every reachable hand and dealer upcard"""
+    # Two-card hands, then every hand reachable from them by hitting
+    keys = set()
+    for first in range(13):
+        for second in range(13):
+            keys.add(hand_key([first, second]))
+    frontier = [(total, soft, has_ace) for total, soft, has_ace, _, _ in keys]
+    while frontier:
+        total, soft, has_ace = frontier.pop()
+        for value in CARD_PROBABILITIES:
+            new_total, new_soft = add_card(total, soft, value)
+            key = (new_total, new_soft, has_ace or value == 11, 0, False)
+            if new_total <= 21 and key not in keys:
+                keys.add(key)
+                frontier.append(key[:3])
+
+    for key in keys:
+        total, soft, has_ace, pair_value, two_cards = key
+        if total > 21:
+            continue
+        for upcard in range(2, 12):
+            action = basic_strategy_action(total, upcard, has_ace, pair_value > 0, two_cards, pair_value == 11)
+            evs = {'stand': stand_ev(total, upcard), 'hit': hit_ev(total, soft, upcard)}
+            if two_cards:
+                evs['double'] = double_ev(total, soft, upcard)
+            if pair_value:
+                evs['split'] = split_ev(pair_value, upcard)
+            decision_table[(key, upcard)] = (action, evs)
+
+def strategy_advice(player_hand, dealer_hand):
+    """Looks up (action, {action: EV}) for a hand against the dealer's upcard, or None for a finished hand"""
+    if not decision_table:
+        build_decision_table()
+    return decision_table.get((hand_key(player_hand), CARD_VALUE[dealer_hand[0]]))
+
+def table_strategy(player_hand, dealer_hand):
+    """basic_strategy() served from the decision table; a finished hand stands"""
+    if not decision_table:
+        build_decision_table()
+    entry = decision_table.get((hand_key(player_hand), CARD_VALUE[dealer_hand[0]]))
+    return entry[0] if entry else 'stand'
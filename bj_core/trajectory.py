@@ -0,0 +1,102 @@
+import math
+from .sketch import TDigest
+
+class BankrollTracker:
+    """Aggregates bankroll paths over many simulations in constant memory.
+
+    Pass one to run_simulation or run_multiple_simulations as trajectory=. The balance is
+    sampled after `points` evenly spaced hands; each sample point, the maximum drawdowns and
+    the times to ruin go into t-digests, so memory does not grow with simulations or hands.
+    """
+
+    def __init__(self, num_hands, points=100, compression=100):
+        self.num_hands = num_hands
+        self.checkpoints = sorted({max(1, round((i + 1) * num_hands / points)) for i in range(min(points, num_hands))})
+        self.compression = compression
+        self.balances = [TDigest(compression) for _ in self.checkpoints]
+        self.balance_sums = [0.0] * len(self.checkpoints)
+        self.drawdowns = TDigest(compression)
+        self.ruin_hands = TDigest(compression)
+        self.runs = 0
+        self.ruined = 0
+        self.drawdown_sum = 0.0
+        self.start(0)
+
+    def start(self, balance):
+        """Begins a simulation path; record() then follows it one hand at a time"""
+        self.peak = balance
+        self.drawdown = 0
+        self.ruin_hand = 0
+        self.hands = 0
+        self.path = []
+
+    def record(self, balance):
+        self.hands += 1
+        if balance > self.peak:
+            self.peak = balance
+        elif self.peak - balance > self.drawdown:
+            self.drawdown = self.peak - balance
+        if balance <= 0 and not self.ruin_hand:
+            self.ruin_hand = self.hands
+        if len(self.path) < len(self.checkpoints) and self.checkpoints[len(self.path)] == self.hands:
+            self.path.append(balance)
+
+    def finish(self, balance):
+        self.add_run(self.path, self.drawdown, self.ruin_hand, balance)
+
+    def add_run(self, path, max_drawdown, ruin_hand, final_balance):
+        """Adds one finished path; sample points after the run ended take its final balance"""
+        for i, digest in enumerate(self.balances):
+            balance = path[i] if i < len(path) else final_balance
+            digest.add(balance)
+            self.balance_sums[i] += balance
+        self.drawdowns.add(max_drawdown)
+        self.drawdown_sum += max_drawdown
+        if ruin_hand:
+            self.ruined += 1
+            self.ruin_hands.add(ruin_hand)
+        self.runs += 1
+
+    def merge(self, other):
+        """Folds in a tracker filled elsewhere (e.g. by another process) with the same checkpoints"""
+        for digest, other_digest in zip(self.balances, other.balances):
+            digest.merge(other_digest)
+        self.balance_sums = [a + b for a, b in zip(self.balance_sums, other.balance_sums)]
+        self.drawdowns.merge(other.drawdowns)
+        self.ruin_hands.merge(other.ruin_hands)
+        self.runs += other.runs
+        self.ruined += other.ruined
+        self.drawdown_sum += other.drawdown_sum
+
+    def summary(self):
+        """Returns bankroll percentiles per sample point, drawdown and ruin statistics"""
+        runs = max(self.runs, 1)
+        return {
+            'runs': self.runs,
+            'hands': list(self.checkpoints),
+            'mean': [total / runs for total in self.balance_sums],
+            'p5': [digest.quantile(0.05) for digest in self.balances],
+            'p50': [digest.quantile(0.5) for digest in self.balances],
+            'p95': [digest.quantile(0.95) for digest in self.balances],
+            'max_drawdown_mean': self.drawdown_sum / runs,
+            'max_drawdown_p50': self.drawdowns.quantile(0.5),
+            'max_drawdown_p95': self.drawdowns.quantile(0.95),
+            'ruin_probability': self.ruined / runs,
+            'time_to_ruin_p50': self.ruin_hands.quantile(0.5) if self.ruined else math.nan,
+        }
+
+def plot_bankroll(summary, filename, title='Bankroll percentiles'):
+    """Saves the P5/P50/P95 bands of a tracker summary as an image"""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(14, 7))
+    ax.fill_between(summary['hands'], summary['p5'], summary['p95'], alpha=0.3, label='P5-P95')
+    ax.plot(summary['hands'], summary['p50'], label='Median')
+    ax.plot(summary['hands'], summary['mean'], linestyle='--', label='Mean')
+    ax.set_title(f"{title} (ruin {summary['ruin_probability']:.1%}, median max drawdown ${summary['max_drawdown_p50']:.0f})")
+    ax.set_xlabel('Hands played')
+    ax.set_ylabel('Balance')
+    ax.legend()
+    ax.grid(True)
+    fig.savefig(filename)
+    plt.close(fig)
@@ -0,0 +1,221 @@
+import math
+import statistics
+import numpy as np
+from .counting import NUM_BINS, HiLowStrategy
+from .parallel import simulation_seed
+from .shoes import CutCard, RandomCut
+
+# Variance reduction for the average final balance of runs that each start from a fresh shoe,
+# as run_parallel's do. That is not quite run_multiple_simulations' figure, whose runs carry
+# the shoe over from one to the next. Counting edges are small next to the spread of a
+# bankroll run, so two tricks are combined:
+#
+# - First-shoe stratification: runs are spread over strata of the Hi-Lo sum of the cards in
+#   front of the first shoe's cut card, in proportion to each stratum's exact (hypergeometric)
+#   probability, instead of landing wherever chance puts them. Only the first shoe of a run
+#   is stratified; every shoe after it is shuffled as usual, so over runs of many shoes this
+#   adds little, and nearly all of the reduction comes from the controls.
+# - Control variates: each counting run's cards are played again with flat bets and the same
+#   play (hand_stream), and the flat winnings are added up per count bin. Bets never change
+#   the cards, so the counting run won about its bet in each bin times these; what they came
+#   to beyond their known means is taken out of its result, leaving little but the luck of
+#   how often each count came up. The means come from a reference run of flat hand streams,
+#   which strategies of the same count can share and a ResultCache keeps. Its error adds to
+#   every estimate made with it, so it has to be many times larger than any one of them: it
+#   only pays off once it is reused, which is why it is made separately and passed in.
+
+def dealt_count_distribution(nb_decks, depths):
+    """Distribution of the Hi-Lo sum of the first d cards of a shuffled shoe, d uniform over depths.
+    Returns (lowest sum, probabilities of that sum and each one above it)."""
+    tags = HiLowStrategy.tags
+    size = nb_decks * 52
+    plus = nb_decks * sum(tag > 0 for tag in tags)
+    minus = nb_decks * sum(tag < 0 for tag in tags)
+    zero = size - plus - minus
+    log_factorial = np.array([math.lgamma(n + 1) for n in range(size + 1)])
+
+    def log_choose(n, k):
+        inside = (k >= 0) & (k <= n)
+        chosen = np.clip(k, 0, n)
+        return np.where(inside, log_factorial[n] - log_factorial[chosen] - log_factorial[n - chosen], -np.inf)
+
+    lows = np.arange(plus + 1)[:, None]  # Low cards (+1) among the first d
+    highs = np.arange(minus + 1)[None, :]  # High cards (-1)
+    sums = (lows - highs + minus).ravel()
+    probabilities = np.zeros(plus + minus + 1)
+    for depth in depths:
+        log_p = (log_choose(plus, lows) + log_choose(minus, highs) + log_choose(zero, depth - lows - highs)
+                 - log_choose(size, np.array(depth)))
+        probabilities += np.bincount(sums, weights=np.exp(log_p).ravel(), minlength=len(probabilities))
+    return -minus, probabilities / len(depths)
+
+def shoe_strata(simulator, strata):
+    """Splits the Hi-Lo sums in front of the cut card into about `strata` groups of equal probability.
+    Returns (lowest sum, stratum of each sum from it, probability of each stratum)."""
+    size = simulator.nb_decks * 52
+    if isinstance(simulator.shoe, RandomCut):
+        depths = range(int(simulator.shoe.low * size), int(simulator.shoe.high * size) + 1)
+    elif isinstance(simulator.shoe, CutCard):
+        depths = [int(simulator.shoe.penetration * size)]
+    else:
+        raise ValueError(f"Shoe starts can only be stratified with a cut card, not {type(simulator.shoe).__name__}")
+    lowest, probabilities = dealt_count_distribution(simulator.nb_decks, depths)
+    middles = np.cumsum(probabilities) - probabilities / 2
+    labels = np.minimum((middles * strata).astype(np.int64), strata - 1)
+    labels = np.unique(labels, return_inverse=True)[1]  # Renumber without empty strata
+    return lowest, labels, np.bincount(labels, weights=probabilities)
+
+def allocate(probabilities, num_simulations):
+    """Shares of num_simulations in proportion to probabilities, by largest remainder, so they
+    add up to exactly num_simulations; ValueError if a share comes out below the two a
+    stratum needs for its variance"""
+    quotas = probabilities * num_simulations
+    allocation = np.floor(quotas).astype(np.int64)
+    largest = np.argsort(allocation - quotas, kind='stable')[:num_simulations - allocation.sum()]
+    allocation[largest] += 1
+    if allocation.min() < 2:
+        raise ValueError(f"{num_simulations} simulations are too few for {len(probabilities)} strata; "
+                         f"each needs at least 2 (use more simulations or fewer strata)")
+    return allocation
+
+def stratified_starts(simulator, strata, num_simulations, seed):
+    """Returns the probability of each stratum and the seeds of its share of num_simulations
+    fresh shoes, taken in order from simulation_seed(seed, 0), simulation_seed(seed, 1), ..."""
+    if strata > 1:
+        lowest, labels, probabilities = shoe_strata(simulator, strata)
+    else:
+        probabilities = np.ones(1)
+    allocation = allocate(probabilities, num_simulations)
+    starts = [[] for _ in allocation]
+    tags = HiLowStrategy.tags
+    index = 0
+    while any(len(seeds) < share for seeds, share in zip(starts, allocation)):
+        start = simulation_seed(seed, index)
+        index += 1
+        stratum = 0
+        if strata > 1:
+            simulator.restart(start)
+            stratum = labels[sum(tags[card] for card in simulator.deck[-simulator.reshuffle_threshold:]) - lowest]
+        if len(starts[stratum]) < allocation[stratum]:
+            starts[stratum].append(start)
+    return probabilities, starts
+
+def flat_winnings(simulator, strategy_class, num_hands, use_basic_strategy):
+    """Flat one-unit winnings per count bin over num_hands hands of the simulator's cards"""
+    results, positions, _ = simulator.hand_stream(strategy_class, num_hands, use_basic_strategy)
+    return np.bincount(np.asarray(positions, dtype=np.int64), weights=np.asarray(results, dtype=np.float64),
+                       minlength=NUM_BINS)
+
+def control_reference(simulator, strategy_class, num_simulations=4000, num_hands=1000, use_basic_strategy=False,
+                      strata=8, seed=0):
+    """The means the control variates of run_reduced_variance need: flat winnings per count bin of
+    runs of num_hands hands, averaged over num_simulations stratified shoe starts.
+
+    Returns a dict of plain values: the mean per bin, the covariance of that estimate, the hands
+    per run it was made for and the hands it took. It depends on the count, not the bets, so
+    strategies sharing a count can share it; with a ResultCache on the simulator it is stored
+    there for the next time.
+    """
+    config = None
+    if simulator.cache is not None:
+        config = {'control_reference': strategy_class.__name__, 'nb_decks': simulator.nb_decks,
+                  'num_players': simulator.num_players, 'tracked_player_position': simulator.tracked_player_position,
+                  'shoe': {'model': type(simulator.shoe).__name__, **vars(simulator.shoe)},
+                  'num_simulations': num_simulations, 'num_hands': num_hands,
+                  'use_basic_strategy': use_basic_strategy, 'strata': strata, 'seed': seed}
+        cached = simulator.cache.get(config)
+        if cached is not None:
+            return cached
+    probabilities, starts = stratified_starts(simulator, strata, num_simulations, seed)
+    hands_played = simulator.hands_played
+    mean = np.zeros(NUM_BINS)
+    covariance = np.zeros((NUM_BINS, NUM_BINS))
+    for probability, seeds in zip(probabilities, starts):
+        winnings = []
+        for start in seeds:
+            simulator.restart(start)
+            winnings.append(flat_winnings(simulator, strategy_class, num_hands, use_basic_strategy))
+        winnings = np.array(winnings)
+        mean += probability * winnings.mean(axis=0)
+        covariance += probability ** 2 * np.cov(winnings, rowvar=False) / len(seeds)
+    reference = {'mean': mean.tolist(), 'covariance': covariance.tolist(), 'num_hands': num_hands,
+                 'hands': simulator.hands_played - hands_played}
+    if config is not None:
+        simulator.cache.put(config, reference)
+    return reference
+
+def run_reduced_variance(simulator, strategy_class, num_simulations=1000, num_hands=1000, use_basic_strategy=False,
+                         strata=8, reference=None, seed=0, confidence=0.95):
+    """Estimates the average final balance of runs from fresh shoes (run_parallel's, not
+    run_multiple_simulations') with first-shoe stratification and, for a counting strategy,
+    control variates. Returns a report dict.
+
+    Simulation i of a plain run starts from simulator.restart(simulation_seed(seed, i)), as in
+    run_parallel; here, starts are drawn from that sequence until each stratum has its share of
+    num_simulations (strata=1 for no stratification, the only choice without a cut card). Only
+    the first shoe of each run is stratified.
+    A counting strategy needs reference, a control_reference() of the same count, simulator
+    settings and num_hands, made with a seed other than this one.
+
+    The report has the estimate with its confidence interval and standard error, the standard
+    error a plain run of as many simulations would have, the ratio of their variances
+    ('variance_reduction') and the hands a plain run would need for the same precision
+    ('equivalent_hands'). Against the hands actually played - the strategy's, the flat replays'
+    and the reference's - that gives 'efficiency', the plain hands each one is worth; above 1
+    the estimate beat a plain run. 'reused_efficiency' leaves the reference out, as for one
+    already paid for by other runs.
+    """
+    control = strategy_class is not None
+    if control and reference is None:
+        raise ValueError("Control variates need a control_reference() of the strategy's count")
+    if control and reference['num_hands'] != num_hands:
+        raise ValueError(f"The reference is for runs of {reference['num_hands']} hands, not {num_hands}")
+    reference_hands = reference['hands'] if control else 0
+    probabilities, starts = stratified_starts(simulator, strata, num_simulations, seed)
+
+    balances = []  # Per stratum: the final balance of each run
+    winnings = []  # Per stratum: each run's flat winnings per count bin
+    hands = control_hands = 0
+    for seeds in starts:
+        stratum_balances = []
+        stratum_winnings = []
+        for start in seeds:
+            simulator.restart(start)
+            hands_played = simulator.hands_played
+            stratum_balances.append(max(simulator.run_simulation(strategy_class, num_hands, use_basic_strategy), 0))
+            hands += simulator.hands_played - hands_played
+            if control:
+                simulator.restart(start)  # The same cards again
+                hands_played = simulator.hands_played
+                stratum_winnings.append(flat_winnings(simulator, strategy_class, num_hands, use_basic_strategy))
+                control_hands += simulator.hands_played - hands_played
+        balances.append(np.array(stratum_balances, dtype=np.float64))
+        winnings.append(np.array(stratum_winnings).reshape(len(seeds), -1))
+
+    # Coefficients of the controls: least squares on the deviations from each stratum's means
+    beta = np.zeros(winnings[0].shape[1])
+    if control:
+        deviations = np.vstack([c - c.mean(axis=0) for c in winnings])
+        targets = np.concatenate([x - x.mean() for x in balances])
+        beta = np.linalg.lstsq(deviations, targets, rcond=None)[0]
+    adjusted = [x - c @ beta for x, c in zip(balances, winnings)]
+    average = float(sum(p * a.mean() for p, a in zip(probabilities, adjusted)))
+    variance = float(sum(p * p * a.var(ddof=1) / len(a) for p, a in zip(probabilities, adjusted)))
+    if control:
+        average += float(beta @ np.array(reference['mean']))
+        variance += float(beta @ np.array(reference['covariance']) @ beta)
+
+    # What a plain run of as many simulations would give: the spread of single runs over all starts
+    plain = float(sum(p * x.mean() for p, x in zip(probabilities, balances)))
+    spread = float(sum(p * (x.var(ddof=1) + (x.mean() - plain) ** 2) for p, x in zip(probabilities, balances)))
+    simulations = sum(len(seeds) for seeds in starts)
+    plain_variance = spread / simulations
+    error = math.sqrt(variance)
+    half_width = statistics.NormalDist().inv_cdf((1 + confidence) / 2) * error
+    reduction = plain_variance / variance if variance else math.inf
+    equivalent_hands = reduction * hands
+    return {'average': average, 'low': average - half_width, 'high': average + half_width, 'confidence': confidence,
+            'standard_error': error, 'plain_standard_error': math.sqrt(plain_variance), 'variance_reduction': reduction,
+            'equivalent_hands': equivalent_hands, 'efficiency': equivalent_hands / (hands + control_hands + reference_hands),
+            'reused_efficiency': equivalent_hands / (hands + control_hands), 'simulations': simulations,
+            'strata': len(starts), 'hands': hands, 'control_hands': control_hands, 'reference_hands': reference_hands}
@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+import pytest
+from bj_core import (BlackjackSimulator, ContinuousShuffler, CountHistogram, CutCard, FiveCountStrategy, HiLowStrategy,
+                     InfiniteDeck, KOStrategy, RandomCut, accel)
+from bj_core.betting import RampBetting
+from bj_core.counting import NUM_BINS
+
+RampHiLow = type('RampHiLow', (RampBetting, HiLowStrategy), {'ramp_units': [1] * (NUM_BINS - 8) + [2, 2, 3, 4, 6, 8, 8, 8]})
+STRATEGIES = [None, HiLowStrategy, KOStrategy, FiveCountStrategy, RampHiLow]
+SHOES = [RandomCut(), RandomCut(0.5, 0.8, each_shoe=True), CutCard(0.75), ContinuousShuffler(2), InfiniteDeck()]
+CASES = [(strategy_class, shoe) for shoe in SHOES for strategy_class in STRATEGIES
+         if strategy_class is None or not isinstance(shoe, InfiniteDeck)]
+NUM_HANDS = 300
+
+
+def play(strategy_class, shoe, kernel):
+    """Balance, count histogram and end state of one run, in the kernel or in BlackjackSimulator's own loop"""
+    simulator = BlackjackSimulator(nb_decks=2, num_players=3, tracked_player_position=1, initial_balance=10 ** 6,
+                                   seed=11, shoe=shoe)
+    histogram = CountHistogram()
+    if kernel:
+        simulator.strategy = simulator.new_strategy(strategy_class)
+        simulator.cards_dealt = 0
+        balance = accel.run_simulation(simulator, NUM_HANDS, True, histogram=histogram)
+    else:
+        balance = simulator.run_simulation(strategy_class, NUM_HANDS, True, histogram=histogram)
+    strategy = vars(simulator.strategy) if simulator.strategy else None
+    return (balance, vars(histogram), simulator.deck, simulator.cards_dealt, simulator.discards,
+            simulator.reshuffle_threshold, simulator.rng.getstate(), simulator.hands_played, strategy)
+
+
+@pytest.mark.parametrize('strategy_class, shoe', CASES,
+                         ids=[f"{getattr(cls, '__name__', None)}-{type(shoe).__name__}" for cls, shoe in CASES])
+def test_kernel_matches_python(strategy_class, shoe):
+    """Compiled with numba, or run as plain Python without it"""
+    assert play(strategy_class, shoe, kernel=True) == play(strategy_class, shoe, kernel=False)
+
+
+@pytest.mark.skipif(not accel.available(), reason="numba is not installed, so test_kernel_matches_python already "
+                                                  "ran the kernel as plain Python")
+def test_uncompiled_kernel_matches_python():
+    """The same check with NUMBA_DISABLE_JIT, so that the kernel's Python source is what runs"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run([sys.executable, '-m', 'pytest', '-q', '-p', 'no:cacheprovider',
+                                f'{os.path.abspath(__file__)}::test_kernel_matches_python'],
+                               cwd=root, env=dict(os.environ, NUMBA_DISABLE_JIT='1'), capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stdout + completed.stderr
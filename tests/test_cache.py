@@ -0,0 +1,17 @@
+from bj_core import ENGINE_VERSION, ResultCache
+
+CONFIG = {'nb_decks': 6, 'strategy': 'HiLowStrategy', 'num_hands': 1000}
+
+
+def test_entries_from_an_older_engine_are_ignored(tmp_path):
+    path = tmp_path / 'results.sqlite'
+    old = ResultCache(path, version='1')
+    old.put(CONFIG, [12.5])
+    assert old.get(CONFIG) == [12.5]
+    old.close()
+
+    cache = ResultCache(path)
+    assert cache.version == ENGINE_VERSION != '1'
+    assert cache.get(CONFIG) is None
+    assert cache.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0] == 0
+    cache.close()
@@ -0,0 +1,20 @@
+import struct
+import BJ_distributed
+from BJ_distributed import RESULT_HEAD, pack_result, unpack_result
+
+BALANCES = [0.0, 1000.0, 1234.5, 0.1, 1e300]
+
+
+def test_result_round_trip():
+    assert unpack_result(pack_result(7, BALANCES, 123456, 1.5)) == (7, BALANCES, 123456, 1.5)
+
+
+def test_result_balances_are_little_endian_on_the_wire():
+    payload = pack_result(7, BALANCES, 123456, 1.5)
+    assert payload[RESULT_HEAD.size:] == struct.pack(f'<{len(BALANCES)}d', *BALANCES)
+
+
+def test_result_round_trip_on_a_big_endian_host(monkeypatch):
+    monkeypatch.setattr(BJ_distributed.sys, 'byteorder', 'big')
+    payload = pack_result(7, BALANCES, 123456, 1.5)
+    assert unpack_result(payload) == (7, BALANCES, 123456, 1.5)
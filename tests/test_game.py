@@ -0,0 +1,16 @@
+from bj_core import BlackjackEngine, make_card, strategy_advice
+
+
+def test_advice_after_a_split_is_for_the_split_hand():
+    engine = BlackjackEngine(num_players=1, player_position=1, num_decks=1, strategy_choice=1, initial_bet=10, seed=0)
+    # Dealt from the end: 4, 4 to the player, 5 up and king down to the dealer, then 2 and 9 to the split hands
+    engine.deck = [make_card(rank, 'clubs') for rank in ('9', '2', 'king', '5', '4')] + [make_card('4', 'hearts')]
+    assert engine.place_bet(10)
+    pair_advice = engine.advice()
+    assert pair_advice == strategy_advice(engine.active_hand(), engine.dealer_upcard_hand())
+
+    assert engine.act('split')
+    assert len(engine.active_hand()) == 2
+    advice = engine.advice()
+    assert advice == strategy_advice(engine.active_hand(), engine.dealer_upcard_hand())
+    assert advice != pair_advice
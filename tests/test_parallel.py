@@ -0,0 +1,23 @@
+import pytest
+from BJ_simulation import make_job, run_job_stealing
+from bj_core import HiLowStrategy
+from bj_core.parallel import run_for, run_parallel
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_run_for_without_time_still_plays_simulation_zero(workers):
+    report = run_for(None, seconds=0, num_hands=50, workers=workers)
+    assert report['simulations'] >= 1
+    assert report['hands'] > 0
+
+
+def test_run_parallel_gives_the_same_average_on_any_number_of_workers():
+    averages = [run_parallel(HiLowStrategy, num_simulations=24, num_hands=200, use_basic_strategy=True, seed=3,
+                             workers=workers) for workers in (1, 3)]
+    assert averages[0] == averages[1]
+
+
+def test_stolen_work_gives_the_same_balances_on_any_number_of_workers():
+    job = make_job({'deck_counts': [1], 'player_positions': [2], 'num_players': 3, 'strategies': ['basic', 'hilo'],
+                    'num_simulations': 12, 'num_hands': 200})
+    assert run_job_stealing(job, workers=1, chunk_seconds=0.01) == run_job_stealing(job, workers=3, chunk_seconds=0.01)
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import BJ_service
+from BJ_service import SimulationService
+
+MALFORMED_SPECS = [
+    {'deck_counts': 5},
+    {'deck_counts': ['1']},
+    {'player_positions': None},
+    {'strategies': [['hilo']]},
+    {'strategies': 'hilo'},
+    {'strategies': ['baccarat']},
+    {'num_hands': True},
+    {'base_bet': 'x'},
+    {'base_bet': 0},
+    {'initial_balance': -10},
+    {'initial_balance': None},
+    {'single_player': 'yes'},
+    {'seed': [1]},
+    {'colour': 'red'},
+    [1, 2],
+]
+
+
+async def request(method, path, spec=None):
+    """Status and body of one request to a service on a free port"""
+    service = SimulationService(workers=1, cache_path=None)
+    server = await asyncio.start_server(service.handle, '127.0.0.1', 0)
+    try:
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        body = json.dumps(spec).encode() if spec is not None else b''
+        writer.write(b'%s %s HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % (method.encode(), path.encode(), len(body)) + body)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+    finally:
+        server.close()
+        await server.wait_closed()
+        service.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+@pytest.mark.parametrize('spec', MALFORMED_SPECS)
+def test_malformed_specs_get_a_400(spec):
+    status, body = asyncio.run(request('POST', '/jobs', spec))
+    assert status == 400
+    assert body['error']
+
+
+@pytest.mark.parametrize('method', ['POST', 'DELETE'])
+def test_health_only_answers_get(method):
+    assert asyncio.run(request(method, '/health'))[0] == 405
+    assert asyncio.run(request('GET', '/health'))[0] == 200
+
+
+def test_failed_cell_cancels_the_rest_of_the_job(monkeypatch):
+    started = []
+    release = threading.Event()
+
+    def run_cell(spec, cell, backend, cache_path):
+        started.append(cell)
+        if len(started) == 1:
+            raise RuntimeError('boom')
+        release.wait(5)
+        return [], 0, 0.0
+
+    async def run():
+        service = SimulationService(workers=1, cache_path=None)
+        service.pool.shutdown()
+        service.pool = ThreadPoolExecutor(max_workers=1)
+        status, body = service.submit({'deck_counts': [1, 2, 4]})
+        assert status == 202
+        job = service.jobs[body['id']]
+        await service.run(job)
+        release.set()
+        service.pool.shutdown(wait=True)  # Runs whatever is still queued
+        service.close()
+        return job
+
+    monkeypatch.setattr(BJ_service, 'run_cell', run_cell)
+    job = asyncio.run(run())
+    assert job.status == 'failed'
+    assert job.error == 'RuntimeError: boom'
+    assert len(started) <= 2  # The worker may have taken the next cell before the failure was seen
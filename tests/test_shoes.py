@@ -0,0 +1,32 @@
+import pytest
+from bj_core import BlackjackSimulator, ContinuousShuffler, FiveCountStrategy, HiLowStrategy, KOStrategy, accel
+
+needs_numba = pytest.mark.skipif(not accel.available(), reason="numba is not installed; backend='numba' would run Python")
+BACKENDS = ['python', pytest.param('numba', marks=needs_numba)]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('strategy_class', [HiLowStrategy, KOStrategy])
+def test_continuous_shuffler_count_stays_bounded(backend, strategy_class):
+    simulator = BlackjackSimulator(nb_decks=6, initial_balance=10 ** 9, seed=1, backend=backend, shoe=ContinuousShuffler())
+    simulator.run_simulation(strategy_class, 20000, use_basic_strategy=True)
+    counted = [card for _, card, is_counted in simulator.discards if is_counted]
+    assert simulator.strategy.running_count == sum(strategy_class.tags[card] for card in counted)
+    assert abs(simulator.strategy.running_count) <= len(simulator.discards)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_continuous_shuffler_five_count_stays_within_the_shoe(backend):
+    simulator = BlackjackSimulator(nb_decks=6, initial_balance=10 ** 9, seed=1, backend=backend, shoe=ContinuousShuffler())
+    simulator.run_simulation(FiveCountStrategy, 20000, use_basic_strategy=True)
+    strategy = simulator.strategy
+    assert 0 <= strategy.seen_fives <= strategy.total_fives
+    assert 0 <= strategy.cards_dealt <= len(simulator.discards)
+
+
+@needs_numba
+def test_continuous_shuffler_backends_agree():
+    balances = [BlackjackSimulator(nb_decks=2, num_players=4, tracked_player_position=2, seed=5, backend=backend,
+                                   shoe=ContinuousShuffler(3)).run_simulation(HiLowStrategy, 2000, use_basic_strategy=True)
+                for backend in ('python', 'numba')]
+    assert balances[0] == balances[1]
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from bj_core import BlackjackSimulator, HiLowStrategy
+from bj_core.variance import allocate, control_reference, run_reduced_variance
+
+
+@pytest.mark.parametrize('num_simulations', [16, 17, 200, 1001])
+def test_allocation_adds_up_to_the_simulations(num_simulations):
+    probabilities = np.array([0.3, 0.25, 0.2, 0.15, 0.1])
+    assert allocate(probabilities, num_simulations).sum() == num_simulations
+
+
+def test_too_few_simulations_for_the_strata():
+    with pytest.raises(ValueError):
+        allocate(np.full(8, 1 / 8), 15)
+
+
+def test_counting_strategy_needs_a_reference():
+    with pytest.raises(ValueError):
+        run_reduced_variance(BlackjackSimulator(seed=0), HiLowStrategy, 20, 100, strata=4)
+
+
+def test_efficiency_counts_every_hand_played():
+    simulator = BlackjackSimulator(seed=0)
+    reference = control_reference(simulator, HiLowStrategy, 40, 100, strata=4, seed='reference')
+    report = run_reduced_variance(simulator, HiLowStrategy, 20, 100, strata=4, reference=reference)
+    assert report['simulations'] == 20
+    assert report['reference_hands'] == reference['hands'] == 4000
+    played = report['hands'] + report['control_hands'] + report['reference_hands']
+    assert report['efficiency'] == pytest.approx(report['equivalent_hands'] / played)
+    assert report['efficiency'] < report['reused_efficiency']